@@ -5,10 +5,12 @@ import random
 from signal import signal, SIGINT, SIGTERM
 
 from forest.configuration import Configuration
+from forest.dsl.dsl_cache import dsl_cache
 from forest.logger import get_logger
-from forest.parse_examples import parse_file, parse_resnax, show, preprocess
-from forest.synthesizer import MultiTreeSynthesizer, KTreeSynthesizer, LinesSynthesizer, \
-    SketchSynthesizer
+from forest.parse_examples import parse_file, parse_resnax, show, split_captures, preprocess
+from forest.solution_cache import SolutionCache, solution_key, verify_solution, \
+    example_sets, examples_contained, warm_start_key
+from forest.synthesizer import synthesize_examples
 from forest.utils import conditions_to_str
 from forest.visitor import RegexInterpreter
 
@@ -27,59 +29,66 @@ def sig_handler(received_signal, frame):
 def main():
     signal(SIGINT, sig_handler)
     signal(SIGTERM, sig_handler)
-    examples_file, resnax, max_examples, config = read_cmd_args()
+    examples_file, resnax, max_examples, use_mmap, config = read_cmd_args()
 
+    random.seed("regex")
     if resnax:
-        valid, invalid, ground_truth = parse_resnax(examples_file)
+        valid, invalid, ground_truth = parse_resnax(examples_file, max_examples, use_mmap)
         condition_invalid = []
     else:
-        valid, invalid, condition_invalid, ground_truth = parse_file(examples_file)
-
-    random.seed("regex")
-    if 0 < max_examples < len(valid):
-        valid = random.sample(valid, max_examples)
-    if 0 < max_examples < len(invalid):
-        invalid = random.sample(invalid, max_examples)
+        valid, invalid, condition_invalid, ground_truth = \
+            parse_file(examples_file, max_examples, use_mmap)
 
     show(valid, invalid, condition_invalid, ground_truth)
 
-    global synthesizer
-    dsl, valid, invalid, condition_invalid, captures, type_validation = \
-        preprocess(valid, invalid, condition_invalid)
-    if config.sketching != 'none':
-        dsl, valid, invalid, condition_invalid, captures, type_validation = \
-            preprocess(valid, invalid, condition_invalid, sketch=True)
-        if "string" not in type_validation[0] and "regex" not in type_validation[0]:
-            raise Exception("MultiTree Synthesizer is only for strings.")
-        synthesizer = SketchSynthesizer(valid, invalid, captures, condition_invalid, dsl,
-                                        ground_truth, configuration=config)
-    elif config.encoding == 'multitree':
-        if "string" not in type_validation[0] and "regex" not in type_validation[0]:
-            raise Exception("MultiTree Synthesizer is only for strings.")
-        synthesizer = MultiTreeSynthesizer(valid, invalid, captures, condition_invalid, dsl,
-                                           ground_truth, configuration=config)
-    elif config.encoding == "dynamic":
-        config.force_dynamic = True
-        synthesizer = MultiTreeSynthesizer(valid, invalid, captures, condition_invalid, dsl,
-                                           ground_truth, configuration=config)
-    elif config.encoding == 'ktree':
-        synthesizer = KTreeSynthesizer(valid, invalid, captures, condition_invalid, dsl,
-                                       ground_truth, configuration=config)
-    elif config.encoding == 'lines':
-        synthesizer = LinesSynthesizer(valid, invalid, captures, condition_invalid, dsl,
-                                       ground_truth, configuration=config)
+    dsl_cache.path = config.dsl_cache_path
+    cache, cache_key, context, previous, skip_smaller = None, None, None, None, False
+    instance = os.path.basename(examples_file)
+    if len(config.cache_path) > 0:
+        # The cache is looked up before building the DSL, so that hits skip parsing it.
+        examples = split_captures(valid, invalid, condition_invalid)
+        cache = SolutionCache(config.cache_path)
+        cache_key = solution_key(*examples, config)
+        program = cache.get(cache_key, *examples)
+        if program is None:
+            # The DSL is only built to resume from, or store, a solution.
+            context = warm_start_key(config, preprocess(valid, invalid, condition_invalid)[0])
+        if program is None and config.warm_start:
+            previous, previous_examples = cache.get_latest(instance, context) or (None, None)
+            if previous is not None and verify_solution(previous, *examples):
+                logger.info('The previous solution satisfies the examples.')
+                program, previous = previous, None
+                cache.put(cache_key, program, instance, example_sets(*examples), context)
+            # The sizes below the previous solution can only be skipped if it was
+            # synthesized from a subset of the examples that are searched now.
+            skip_smaller = previous_examples is not None and config.cegis_examples == 0 \
+                and not config.deduplicate \
+                and examples_contained(previous_examples, example_sets(*examples))
+        if program is not None:
+            cache.close()
+            print_solution(program)
+            return program
+
+    warm_start = (previous, skip_smaller) if previous is not None else None
+    program = synthesize_examples(valid, invalid, condition_invalid, ground_truth, config,
+                                  warm_start, set_synthesizer)
+
+    print_solution(program)
+    if cache is not None:
+        if program is not None and not config.die:
+            cache.put(cache_key, program, instance, example_sets(*examples), context)
+        cache.close()
+    return program
 
-    else:
-        raise ValueError
 
-    return synthesize(type_validation)
+def set_synthesizer(new_synthesizer):
+    """ Keep the running synthesizer, for the signal handler. """
+    global synthesizer
+    synthesizer = new_synthesizer
 
 
-def synthesize(type_validation):
-    global synthesizer
-    assert synthesizer is not None
+def print_solution(program):
     printer = RegexInterpreter()
-    program = synthesizer.synthesize()
     if program is not None:
         regex, capturing_groups, capture_conditions = program
         conditions, condition_captures = capture_conditions
@@ -91,12 +100,11 @@ def synthesize(type_validation):
             print(f'Captures:\n  {printer.eval(regex, captures=capturing_groups)}')
     else:
         print('Solution not found!')
-    return program
 
 
 # noinspection PyTypeChecker
 def read_cmd_args():
-    encodings = ('multitree', 'dynamic', 'ktree', 'lines')
+    encodings = ('multitree', 'dynamic', 'ktree', 'lines', 'bottomup', 'portfolio')
     sketching = ('none', 'smt', 'brute-force', 'hybrid')
     parser = argparse.ArgumentParser(description='Validations Synthesizer',
                                      formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -110,16 +118,40 @@ def read_cmd_args():
                         help="Self interaction mode.")
     parser.add_argument('--no-pruning', '--nopruning', action='store_true',
                         help='Disable pruning.')
+    parser.add_argument('--equivalence', action='store_true',
+                        help='Prune subtrees that match the same substrings as smaller ones.')
     parser.add_argument('--no-captures', '--nocaptures', action='store_true',
                         help='Disable synthesis of capturing groups.')
     parser.add_argument('--no-conditions', '--noconditions', action='store_true',
                         help='Disable synthesis of capture conditions.')
     parser.add_argument('--no-disambiguation', '--nodisambiguation', action='store_true',
                         help='Disable disambiguation through interaction: return first regex.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Reuse the multitree SMT encoding across depths.')
+    parser.add_argument('-p', '--processes', type=int, default=1,
+                        help='Worker processes for the multitree encodings.')
+    parser.add_argument('--check-processes', type=int, default=1,
+                        help='Worker processes checking the examples of large instances.')
+    parser.add_argument('-c', '--cache', metavar='FILE', type=str, default='',
+                        help='SQLite file caching the solutions of previous runs.')
+    parser.add_argument('--dsl-cache', metavar='DIR', type=str, default='',
+                        help='Directory caching the parsed DSLs across runs.')
+    parser.add_argument('-w', '--warm-start', action='store_true',
+                        help='Resume from the last cached solution of the same examples file.')
     parser.add_argument('--resnax', action='store_true',
                         help='Read resnax i/o examples format.')
     parser.add_argument('-m', '--max-examples', type=int, default=-1,
                         help='Limit the number of examples of each type. -1: unlimited.')
+    parser.add_argument('--mmap', action='store_true',
+                        help='Memory-map the examples file instead of reading it.')
+    parser.add_argument('--cegis', metavar='N', type=int, default=0,
+                        help='Start from N valid and N invalid examples of different shapes, '
+                             'and add the examples that the solutions get wrong. 0: disabled.')
+    parser.add_argument('--dedup', action='store_true',
+                        help='Synthesize from the examples that differ in more than digits '
+                             'or letters, then check the solution against all of them.')
+    parser.add_argument('--profile', metavar='FILE', type=str, default='',
+                        help='Time each phase of the search, and write a flame graph to FILE.')
     parser.add_argument('-k', '--sketch', metavar='|'.join(sketching), type=str,
                         default='none', help='Enable sketching.')
     args = parser.parse_args()
@@ -131,6 +163,8 @@ def read_cmd_args():
         raise ValueError('Unknown encoding ' + args.encoding)
     if args.sketch not in sketching:
         raise ValueError('Unknown sketching mode ' + args.encoding)
+    if args.warm_start and len(args.cache) == 0:
+        raise ValueError('Warm start requires a solution cache')
 
     if len(args.log) > 0:
         if not os.path.exists(args.log):
@@ -149,13 +183,19 @@ def read_cmd_args():
 
     config = Configuration(encoding=args.encoding, self_interact=args.self_interact,
                            log_path=log_path, pruning=not args.no_pruning,
+                           equivalence_pruning=args.equivalence,
                            synth_captures=not args.no_captures,
                            synth_conditions=not args.no_conditions,
                            disambiguation=not args.no_disambiguation,
-                           sketching=args.sketch)
+                           sketching=args.sketch, incremental=args.incremental,
+                           processes=args.processes,
+                           check_processes=args.check_processes, cache_path=args.cache,
+                           warm_start=args.warm_start, dsl_cache_path=args.dsl_cache,
+                           cegis_examples=args.cegis, deduplicate=args.dedup,
+                           profile_path=args.profile)
     config.print_first_regex = True
 
-    return args.file, args.resnax, args.max_examples, config
+    return args.file, args.resnax, args.max_examples, args.mmap, config
 
 
 if __name__ == '__main__':
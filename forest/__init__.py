@@ -1,9 +1,12 @@
-from . import decider, spec
-from . import dsl
-from . import enumerator
-from . import generic_visitor
-from . import logger
-from . import synthesizer
-from . import visitor
-from . import stats
-from . import configuration
+import importlib
+
+# Subpackages are imported on first access, to keep the startup of scripts that only
+# need some of them fast.
+_submodules = ('configuration', 'decider', 'dsl', 'enumerator', 'generic_visitor', 'logger',
+               'spec', 'stats', 'synthesizer', 'visitor')
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
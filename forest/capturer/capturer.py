@@ -38,6 +38,18 @@ class Capturer:
         self.interpreter = RegexInterpreter()
         self.max_before_distinguish = 2  # 2 for conversational clarification
 
+    @staticmethod
+    def _compile_captures(regex_str: str, num_captures: int):
+        """ Compile a regex with num_captures capturing groups, or return None if the
+        groups were not placed as one group per capture. That happens when a group starts at
+        a range whose regex has more than one leaf and ends at one of them, since both are
+        leaves of the regex. """
+        try:
+            compiled_re = re.compile(regex_str)
+        except re.error:
+            return None
+        return compiled_re if compiled_re.groups == num_captures else None
+
     def synthesize_capturing_groups(self, regex: Node):
         """ Given regex, find capturing groups which match self.captures """
         if len(self.captures) == 0 or len(self.captures[0]) == 0:
@@ -47,7 +59,9 @@ class Capturer:
         for sub in all_sublists_n(nodes, len(self.captures[0])):
             stats.enumerated_cap_groups += 1
             regex_str = self.interpreter.eval(regex, captures=sub)
-            compiled_re = re.compile(regex_str)
+            compiled_re = self._compile_captures(regex_str, len(sub))
+            if compiled_re is None:
+                continue
             if not all(
                     map(lambda s: compiled_re.fullmatch(s[0]) is not None, self.valid)):
                 continue
@@ -79,7 +93,9 @@ class Capturer:
             for sub in all_sublists_n(nodes, n):
                 stats.enumerated_cap_conditions += 1
                 regex_str = self.interpreter.eval(regex, captures=sub)
-                compiled_re = re.compile(regex_str)
+                compiled_re = self._compile_captures(regex_str, len(sub))
+                if compiled_re is None:
+                    continue
                 if not all(map(lambda ex: compiled_re.fullmatch(ex[0]) is not None,
                                self.valid)):
                     continue
@@ -100,6 +116,8 @@ class Capturer:
 
         conditions = []
         while True:
+            if self.configuration.die and len(conditions) > 0:
+                return conditions[0]
             new_condition = self._cc_enumerator.next()
             if new_condition is not None:
                 if not self.configuration.disambiguation:
@@ -138,7 +156,7 @@ class Capturer:
     def _interact(self, dist_input, keep_if_valid, keep_if_invalid):
         """ Interact with user to ascertain whether the distinguishing input is valid """
         while not self.configuration.die:
-            x = input(f'Is "{dist_input}" valid? (y/n)\n')
+            x = self.configuration.ask(f'Is "{dist_input}" valid? (y/n)\n')
             if x.lower().rstrip() in yes_values:
                 logger.info(f'"{dist_input}" is {colored("valid", "green")}.')
                 self.valid.append([dist_input])
@@ -151,6 +169,8 @@ class Capturer:
                 return keep_if_invalid
             else:
                 logger.info(f"Invalid answer {x}! Please answer 'yes' or 'no'.")
+        # stopped without an answer: all the conditions still satisfy the examples
+        return keep_if_valid + keep_if_invalid
 
     def _auto_distinguish(self, dist_input: str, keep_if_valid: List, keep_if_invalid: List):
         """ Given distinguishing input, simulate user interaction based on ground truth """
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Callable
 
 
 @dataclass
@@ -14,9 +15,24 @@ class Configuration:
     # Path to the log file. Empty string means no log is written.
     log_path: str = ''
 
+    # Path to the SQLite file caching the solutions. Empty string means no cache is used.
+    cache_path: str = ''
+
+    # Directory where parsed DSLs are saved, to reuse in later runs. Empty string means
+    # parsed DSLs are only reused within the same run.
+    dsl_cache_path: str = ''
+
+    # Resume the search from the last cached solution of the same examples file, when the
+    # examples changed since then.
+    warm_start: bool = False
+
     # Activate/deactivate pruning
     pruning: bool = True
 
+    # Block the subtrees that match the same substrings of the examples as a smaller
+    # subtree. Only used with pruning. It can change the solution.
+    equivalence_pruning: bool = False
+
     # Activate/deactivate synthesis of capturing groups
     synth_captures: bool = True
 
@@ -32,6 +48,35 @@ class Configuration:
     # Forces dynamic multitree when the encoding is multitree.
     force_dynamic: bool = False
 
+    # Reuse the SMT encoding of the static multitree enumerator when the depth increases,
+    # instead of building a new enumerator for each depth.
+    incremental: bool = False
+
+    # Number of worker processes exploring at the same time the (depth, length) cells of
+    # the dynamic multitree encoding, or the cubes of the static multitree encoding.
+    processes: int = 1
+
+    # Number of worker processes among which the examples are sharded when checking a
+    # regex. Only used on instances with at least min_sharded_examples examples.
+    check_processes: int = 1
+    min_sharded_examples: int = 1000
+
+    # Number of valid and of invalid examples that counterexample-guided synthesis starts
+    # from. Solutions are then checked against all the examples, and the ones they get
+    # wrong are added to the search. 0 means all examples are used from the start.
+    cegis_examples: int = 0
+
+    # Collapse the examples with the same character-class shape before synthesis. The
+    # examples that the solutions get wrong are added back, as with cegis_examples.
+    deduplicate: bool = False
+
+    # File where the time spent in each phase of the regex search is written, in the
+    # folded stack format of flamegraph.pl. Empty string means the search is not profiled.
+    profile_path: str = ''
+
+    # Asks the user a yes/no question and returns the answer.
+    ask: Callable[[str], str] = input
+
     # Prints the first correct regex found
     print_first_regex: bool = False
 
@@ -1,4 +1,7 @@
+from .corpus_checker import CorpusChecker
 from .decider import Decider
 from .example_decider import Example, ExampleDecider
+from .regex_cache import RegexCache
 from .regex_decider import RegexDecider
+from .sharded_checker import ShardedExampleChecker
 from .result import ok, bad
@@ -0,0 +1,52 @@
+import re
+from bisect import bisect_right
+from typing import List, Tuple, Set
+
+
+class _JoinedExamples:
+    """ Distinct example strings joined by newlines, so that a regex can be matched
+    against all of them with a single multiline scan. """
+
+    def __init__(self, examples: List[str]):
+        self.examples = list(dict.fromkeys(examples))
+        self.text = '\n'.join(self.examples)
+        self.starts = []
+        start = 0
+        for ex in self.examples:
+            self.starts.append(start)
+            start += len(ex) + 1
+        # Examples with newlines would be split by the scan: check them one by one.
+        self.joinable = not any(map(lambda ex: '\n' in ex, self.examples))
+
+    def matched(self, regex_str: str) -> Set[int]:
+        """ Indices of the examples that the regex fully matches. """
+        if self.joinable and '[^' not in regex_str:
+            # The regexes have no construct that matches a newline, so each match found
+            # by the scan spans exactly one example.
+            pattern = re.compile(f'^(?:{regex_str})$', re.MULTILINE)
+            return set(map(lambda m: bisect_right(self.starts, m.start()) - 1,
+                           pattern.finditer(self.text)))
+        pattern = re.compile(regex_str)
+        return set(filter(lambda i: pattern.fullmatch(self.examples[i]) is not None,
+                          range(len(self.examples))))
+
+
+class CorpusChecker:
+    """ Finds the examples of a large corpus that a regex gets wrong. Used to check the
+    solutions found on a small subset of the examples against all of them. """
+
+    def __init__(self, valid_examples: List[str], invalid_examples: List[str]):
+        self._valid = _JoinedExamples(valid_examples)
+        self._invalid = _JoinedExamples(invalid_examples)
+
+    def __len__(self):
+        return len(self._valid.examples) + len(self._invalid.examples)
+
+    def counterexamples(self, regex_str: str) -> Tuple[List[str], List[str]]:
+        """ Returns the valid examples that the regex does not match, and the invalid
+        examples that it matches. """
+        matched = self._valid.matched(regex_str)
+        missed_valid = [ex for i, ex in enumerate(self._valid.examples) if i not in matched]
+        matched = self._invalid.matched(regex_str)
+        matched_invalid = [self._invalid.examples[i] for i in sorted(matched)]
+        return missed_valid, matched_invalid
@@ -4,10 +4,15 @@ from typing import NamedTuple, List, Any
 import z3
 
 from .decider import Decider
+from .regex_cache import RegexCache
 from .result import ok, bad
+from .sharded_checker import ShardedExampleChecker
 from ..dsl import Node
+from ..stats import Statistics
 from ..visitor import Interpreter, ToZ3
 
+stats = Statistics.get_statistics()
+
 Example = NamedTuple('Example', [
     ('input', List[Any]),
     ('output', Any)])
@@ -19,11 +24,18 @@ class ExampleDecider(Decider):
         super().__init__()
         self._interpreter = interpreter
         self._to_z3 = ToZ3()
+        self._regex_cache = RegexCache(interpreter)
         self.use_smt = False
         if len(examples) == 0:
             raise ValueError(
                 'ExampleDecider cannot take an empty list of examples')
         self._examples = examples
+        # Optional pool of workers that check the examples in parallel.
+        self._checker = None
+        # Indices of the examples in the order they are checked, sorted by the number of
+        # regexes each example rejected, so that the most discriminating are tried first.
+        self._check_order = list(range(len(examples)))
+        self._rejections = [0] * len(examples)
 
     @property
     def interpreter(self):
@@ -37,18 +49,62 @@ class ExampleDecider(Decider):
         """ Add new example to specification """
         new = Example(ex_in, ex_out)
         self.examples.append(new)
+        self._check_order.append(len(self._rejections))
+        self._rejections.append(0)
+
+    def use_sharded_checker(self, processes: int, checker: ShardedExampleChecker = None):
+        """ Check the current examples on a pool of worker processes, each one checking a
+        shard of them. Examples added afterwards are checked in this process. The pool of
+        checker, detached from another decider, is reused if it holds the first examples of
+        this one, and stopped otherwise. """
+        self.close()
+        if checker is not None and checker.usable and checker.holds(self._examples):
+            self._checker = checker
+            return
+        if checker is not None:
+            checker.close()
+        self._checker = ShardedExampleChecker(self._examples, processes)
+
+    def detach_checker(self):
+        """ Returns the sharded checker, if any, without stopping its workers, so that it
+        can be handed to another decider. """
+        checker = self._checker
+        self._checker = None
+        return checker
+
+    def close(self):
+        """ Stop the workers of the sharded checker, if any. """
+        if self._checker is not None:
+            self._checker.close()
+            self._checker = None
 
     def has_failed_examples(self, regex: Node):
         """
         Test whether the given program would fail on any of the examples provided.
         """
-        if not self.use_smt:
-            regex = self._interpreter.eval(regex)
-            re_compiled = re.compile(regex)
-            return any(
-                map(lambda x: self._match(re_compiled, x.input) != x.output,
-                    self._examples)
-            )
+        if not self.use_smt and self._checker is not None and self._checker.usable:
+            regex_str, re_compiled = self._regex_cache.get(regex)
+            failed, matched = self._checker.check(regex_str)
+            stats.example_matches += matched
+            for ex_idx in failed:
+                self._promote(self._check_order.index(ex_idx))
+            if len(failed) > 0:
+                return True
+            for x in self._examples[len(self._checker):]:
+                stats.example_matches += 1
+                if self._match(re_compiled, x.input) != x.output:
+                    return True
+            return False
+        elif not self.use_smt:
+            _, re_compiled = self._regex_cache.get(regex)
+            for pos, ex_idx in enumerate(self._check_order):
+                x = self._examples[ex_idx]
+                if self._match(re_compiled, x.input) != x.output:
+                    stats.example_matches += pos + 1
+                    self._promote(pos)
+                    return True
+            stats.example_matches += len(self._check_order)
+            return False
         else:
             regex_z3 = self._to_z3.eval(regex)
             z3_solver = z3.Solver()
@@ -62,6 +118,17 @@ class ExampleDecider(Decider):
 
             return z3_solver.check() == z3.unsat
 
+    def _promote(self, pos: int):
+        """ Count a rejection for the example checked at position pos, and move it ahead of
+        the examples with fewer rejections. """
+        ex_idx = self._check_order[pos]
+        self._rejections[ex_idx] += 1
+        while pos > 0 and \
+                self._rejections[self._check_order[pos - 1]] < self._rejections[ex_idx]:
+            self._check_order[pos] = self._check_order[pos - 1]
+            pos -= 1
+        self._check_order[pos] = ex_idx
+
     def analyze(self, prog):
         '''
         This basic version of analyze() merely interprets the AST and sees if it conforms
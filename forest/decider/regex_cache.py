@@ -0,0 +1,66 @@
+import re
+from collections import OrderedDict
+from typing import Pattern, Tuple
+
+from ..dsl import Node
+from ..profiler import profiler
+from ..stats import Statistics
+from ..visitor import Interpreter
+
+stats = Statistics.get_statistics()
+
+
+class _DeepKey:
+    """ Wraps an AST so that it is hashed and compared by structure instead of identity. """
+    __slots__ = ('node', '_hash')
+
+    def __init__(self, node: Node):
+        self.node = node
+        self._hash = node.deep_hash()
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return isinstance(other, _DeepKey) and self.node.deep_eq(other.node)
+
+
+class RegexCache:
+    """ Bounded LRU cache from regex ASTs to their printed and compiled forms. """
+
+    def __init__(self, interpreter: Interpreter, max_size: int = 10000):
+        self._interpreter = interpreter
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, regex: Node) -> Tuple[str, Pattern]:
+        """ Returns the regex printed by the interpreter and the corresponding compiled
+        pattern. """
+        key = _DeepKey(regex)
+        entry = self._entries.get(key)
+        if entry is not None:
+            stats.regex_cache_hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+        stats.regex_cache_misses += 1
+        with profiler.phase('print'):
+            regex_str = self._interpreter.eval(regex)
+        with profiler.phase('compile'):
+            entry = (regex_str, re.compile(regex_str))
+        self._entries[key] = entry
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def print(self, regex: Node) -> str:
+        """ Returns the regex printed by the interpreter, without compiling it if it is not
+        in the cache. """
+        entry = self._entries.get(_DeepKey(regex))
+        if entry is not None:
+            return entry[0]
+        with profiler.phase('print'):
+            return self._interpreter.eval(regex)
+
+    def __len__(self):
+        return len(self._entries)
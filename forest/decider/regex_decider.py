@@ -1,11 +1,15 @@
+import hashlib
 import re
+from array import array
+from typing import Union, Tuple
 
 from forest.spec import Predicate
 from forest.spec.expr import *
 from .example_decider import Example, ExampleDecider
 from .result import ok, bad
-from ..dsl import ApplyNode
+from ..dsl import ApplyNode, Node
 from ..logger import get_logger
+from ..profiler import profiler
 from ..visitor import Interpreter
 
 logger = get_logger('forest')
@@ -21,6 +25,24 @@ class RegexDecider(ExampleDecider):
         self.valid_exs = valid_examples
         self.split_valid = split_valid
 
+        # Bitsets of the valid examples that each regex matches, keyed by the printed
+        # regex: bit i is set iff the regex matches valid_exs[i] (or split_valid[i]).
+        self._search_vectors = {}
+        self._fullmatch_vectors = {}
+        self._all_valid = (1 << len(self.valid_exs)) - 1
+
+        # Observational equivalence: the signature of a regex is the set of distinct
+        # substrings of the examples that it fullmatches. A subtree can only match
+        # substrings of the examples, so two regexes with the same signature can replace
+        # each other in any regex without changing which examples it matches. Each class
+        # of regexes is represented by the smallest one seen, keyed by (tree_idx,
+        # signature). The substrings are collected on the first signature, and
+        # _domain_text joins them, one per line.
+        self._domain = None
+        self._domain_text = None
+        self._signatures = {}
+        self._representatives = {}
+
         # Ensure the split examples all have the same number of substrings
         assert self.split_valid is None or all(
             map(lambda x: len(x) == len(self.split_valid[0]), self.split_valid))
@@ -30,19 +52,84 @@ class RegexDecider(ExampleDecider):
         Analyze the reason why a synthesized program fails if it does not
         pass all the tests.
         """
-        if not self.has_failed_examples(regex):
+        with profiler.phase('match'):
+            failed = self.has_failed_examples(regex)
+        if not failed:
             return ok()
         else:
-            if regex.production.lhs.name == "Regex":
-                new_predicates = self.traverse_regex(regex)
-            else:
-                new_predicates = self.traverse_program(regex, self._examples)
+            with profiler.phase('prune'):
+                if regex.production.lhs.name == "Regex":
+                    new_predicates = self.traverse_regex(regex)
+                else:
+                    new_predicates = self.traverse_program(regex, self._examples)
 
             if len(new_predicates) == 0:
                 return bad()
             else:
                 return bad(why=new_predicates)
 
+    def add_example(self, ex_in, ex_out):
+        super().add_example(ex_in, ex_out)
+        # The equivalences only hold for the examples they were computed on.
+        if self._domain is not None:
+            self._add_to_domain(ex_in[0])
+        self._signatures = {}
+        self._representatives = {}
+
+    def redundant_subtrees(self, regex: ApplyNode) -> List[Tuple[Node, int]]:
+        """ Subtrees of the trees of regex that are observationally equivalent to a smaller
+        and not deeper subtree seen before in the same tree. A subtree smaller than the
+        representative of its class replaces it, and the previous representative is
+        returned instead. Returns pairs of subtree and tree index. """
+        redundant = []
+        for tree_idx, tree in enumerate(regex.children):
+            for node in tree.get_subtree():
+                if node.type.name != "Regex":
+                    continue
+                signature = self.signature(node)
+                if signature is None:
+                    return []
+                key = (tree_idx, signature)
+                size, depth = len(node.get_subtree()), node.depth()
+                representative = self._representatives.get(key)
+                if representative is None:
+                    self._representatives[key] = (size, depth, node)
+                elif representative[0] < size and representative[1] <= depth:
+                    redundant.append((node, tree_idx))
+                elif size < representative[0] and depth <= representative[1]:
+                    self._representatives[key] = (size, depth, node)
+                    redundant.append((representative[2], tree_idx))
+        return redundant
+
+    def signature(self, regex: Node):
+        """ Digest of the lines of _domain_text that regex fullmatches, or None if the
+        examples contain line breaks. """
+        regex_str = self._regex_cache.print(regex)
+        signature = self._signatures.get(regex_str)
+        if signature is not None:
+            return signature
+
+        if self._domain is None:
+            self._domain = set()
+            for example in self._examples:
+                self._add_to_domain(example.input[0])
+        if self._domain_text is None:
+            if any(map(lambda string: '\n' in string, self._domain)):
+                return None
+            self._domain_text = '\n'.join(sorted(self._domain))
+        rec = re.compile(f'^(?:{regex_str})$', re.MULTILINE)
+        starts = array('q', map(lambda m: m.start(), rec.finditer(self._domain_text)))
+        signature = hashlib.blake2b(starts.tobytes(), digest_size=16).digest()
+        self._signatures[regex_str] = signature
+        return signature
+
+    def _add_to_domain(self, example: str):
+        """ Add the substrings of the example to the signature domain. """
+        for start in range(len(example) + 1):
+            for end in range(start, len(example) + 1):
+                self._domain.add(example[start:end])
+        self._domain_text = None
+
     def traverse_regex(self, node: ApplyNode):
         """ Analyze regex programs """
         new_predicates = []
@@ -54,18 +141,15 @@ class RegexDecider(ExampleDecider):
             if node.name == "concat" and node.has_children():
                 # if one child does not have a match in any of the examples,
                 # then it cannot happen as a direct top concat node
-                regex = self.interpreter.eval(tree)
-                if not self.always_matches_examples(regex):
+                if not self.always_matches_examples(tree):
                     new_predicate = Predicate("block_tree", [tree, tree_idx])
                     new_predicates.append(new_predicate)
 
                 if self.split_valid is not None:
                     # MultiTree enumerator was used
                     assert len(node.children) == len(self.split_valid[0])
-                    re_c = re.compile(regex)
-                    matches = map(lambda ex: re_c.fullmatch(ex[tree_idx]) \
-                                             is not None, self.split_valid)
-                    if not all(matches):
+                    all_split = (1 << len(self.split_valid)) - 1
+                    if self._fullmatch_vector(tree, tree_idx) != all_split:
                         new_predicate = Predicate("block_tree", [tree, tree_idx])
                         new_predicates.append(new_predicate)
 
@@ -79,8 +163,7 @@ class RegexDecider(ExampleDecider):
         production = node.production
         if production.is_function():
             if production.name == "concat":
-                regex = self.interpreter.eval(node)
-                if self.never_matches_examples(regex):
+                if self.never_matches_examples(node):
                     new_predicates.append(Predicate("block_subtree", [node, tree_idx]))
 
             elif production.name == "range":
@@ -89,7 +172,7 @@ class RegexDecider(ExampleDecider):
                     r{n} does not always occurs
                     r{m} never occurs
                 '''
-                regex = self.interpreter.eval(node, self.valid_exs[0])
+                regex, _ = self._regex_cache.get(node)
                 bounds = node.args[1].data.split(',')
                 if len(bounds) < 2:  # sketches
                     return
@@ -108,7 +191,7 @@ class RegexDecider(ExampleDecider):
                         Predicate("block_range_upper_bound", [node, tree_idx]))
 
             elif production.name == "kleene" or production.name == "posit":
-                regex = self.interpreter.eval(node.children[0])
+                regex, _ = self._regex_cache.get(node.children[0])
                 regex = regex + regex
                 if self.never_matches_examples(regex):
                     new_predicates.append(
@@ -136,16 +219,53 @@ class RegexDecider(ExampleDecider):
         else:
             return new_predicates
 
-    def never_matches_examples(self, regex: str):
+    def never_matches_examples(self, regex: Union[str, Node]):
         """ Returns True if no example contains the given regex """
-        rec = re.compile(regex)
-        return not any(map(lambda ex: rec.search(ex[0]) is not None,
-                           self.valid_exs))
+        return self._search_vector(regex) == 0
 
-    def always_matches_examples(self, regex: str):
+    def always_matches_examples(self, regex: Union[str, Node]):
         """ Returns True if all examples contain the given regex """
-        rec = re.compile(regex)
-        return all(map(lambda ex: rec.search(ex[0]) is not None, self.valid_exs))
+        return self._search_vector(regex) == self._all_valid
+
+    def _search_vector(self, regex: Union[str, Node]) -> int:
+        """ Bitset of the valid examples that contain the given regex. """
+        if isinstance(regex, Node):
+            regex_str, rec = self._regex_cache.get(regex)
+        else:
+            regex_str, rec = regex, None
+        vector = self._search_vectors.get(regex_str)
+        if vector is not None:
+            return vector
+
+        candidates = self._all_valid
+        if isinstance(regex, ApplyNode) and regex.name == "concat":
+            # A concat can only occur in the examples in which all its children occur.
+            for child in regex.children:
+                candidates &= self._search_vector(child)
+        if candidates != 0:
+            if rec is None:
+                rec = re.compile(regex_str)
+            vector = 0
+            for ex_idx, ex in enumerate(self.valid_exs):
+                if candidates >> ex_idx & 1 and rec.search(ex[0]) is not None:
+                    vector |= 1 << ex_idx
+        else:
+            vector = 0
+        self._search_vectors[regex_str] = vector
+        return vector
+
+    def _fullmatch_vector(self, tree: Node, tree_idx: int) -> int:
+        """ Bitset of the split examples whose field tree_idx is matched by tree. """
+        regex_str, rec = self._regex_cache.get(tree)
+        key = (regex_str, tree_idx)
+        vector = self._fullmatch_vectors.get(key)
+        if vector is None:
+            vector = 0
+            for ex_idx, ex in enumerate(self.split_valid):
+                if rec.fullmatch(ex[tree_idx]) is not None:
+                    vector |= 1 << ex_idx
+            self._fullmatch_vectors[key] = vector
+        return vector
 
     def traverse_program(self, program, examples):
         """ Traverse eventually non-regex programs """
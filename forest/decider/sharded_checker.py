@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import re
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple
+
+# Number of examples a worker checks between two looks at the cancellation flag.
+_CANCEL_CHECK_PERIOD = 64
+
+
+def _check_shard(corpus_name, offsets_name, flags_name, lo, hi, cancelled, conn):
+    """ Entry point of the worker processes. Decodes the examples lo..hi-1 from the shared
+    corpus once, then checks every regex it receives against them, answering with the
+    index of the first example it disagrees with, or -1, and the number of examples it
+    matched the regex against. """
+    corpus = SharedMemory(corpus_name)
+    offsets_shm = SharedMemory(offsets_name)
+    flags = SharedMemory(flags_name)
+    try:
+        offsets = offsets_shm.buf.cast('q')
+        inputs = [bytes(corpus.buf[offsets[i]:offsets[i + 1]]).decode()
+                  for i in range(lo, hi)]
+        offsets.release()
+        expected = bytes(flags.buf[lo:hi])
+
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            generation, regex_str = task
+            pattern = re.compile(regex_str)
+            failed = -1
+            matched = 0
+            for i, example in enumerate(inputs):
+                if i % _CANCEL_CHECK_PERIOD == 0 and cancelled.value == generation:
+                    break
+                matched += 1
+                if (pattern.fullmatch(example) is not None) != expected[i]:
+                    failed = lo + i
+                    cancelled.value = generation
+                    break
+            conn.send((failed, matched))
+    finally:
+        corpus.close()
+        offsets_shm.close()
+        flags.close()
+
+
+class ShardedExampleChecker:
+    """ Checks regexes against a fixed corpus of examples using a persistent pool of
+    worker processes. The corpus is placed in shared memory once and each worker checks
+    its own shard of it. """
+
+    def __init__(self, examples: List[Tuple[List[str], bool]], processes: int):
+        if len(examples) == 0:
+            raise ValueError('ShardedExampleChecker cannot take an empty list of examples')
+        self.n_examples = len(examples)
+        self._examples = list(map(lambda ex: (ex[0][0], bool(ex[1])), examples))
+        self._owner = os.getpid()
+        self._generation = 0
+
+        encoded = list(map(lambda ex: ex[0][0].encode(), examples))
+        offsets = [0]
+        for ex in encoded:
+            offsets.append(offsets[-1] + len(ex))
+        self._corpus = SharedMemory(create=True, size=max(1, offsets[-1]))
+        self._corpus.buf[:offsets[-1]] = b''.join(encoded)
+        offsets = array('q', offsets).tobytes()
+        self._offsets = SharedMemory(create=True, size=len(offsets))
+        self._offsets.buf[:len(offsets)] = offsets
+        # expected outputs
+        self._flags = SharedMemory(create=True, size=self.n_examples)
+        self._flags.buf[:self.n_examples] = bytes(map(lambda ex: bool(ex[1]), examples))
+        self._cancelled = multiprocessing.RawValue('q', -1)
+
+        processes = max(1, min(processes, self.n_examples))
+        bounds = [self.n_examples * i // processes for i in range(processes + 1)]
+        self._connections = []
+        self._workers = []
+        for lo, hi in zip(bounds, bounds[1:]):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_check_shard,
+                args=(self._corpus.name, self._offsets.name, self._flags.name,
+                      lo, hi, self._cancelled, child_conn),
+                daemon=True)
+            worker.start()
+            self._connections.append(parent_conn)
+            self._workers.append(worker)
+
+    def __len__(self):
+        return self.n_examples
+
+    @property
+    def usable(self):
+        """ The pool can only be driven by the process that created it, not by processes
+        forked from it. """
+        return self._owner == os.getpid() and len(self._workers) > 0
+
+    def holds(self, examples: List[Tuple[List[str], bool]]) -> bool:
+        """ Whether the corpus holds the first examples of the given list, so that the
+        pool can check them for a decider other than the one it was created for. """
+        return len(examples) >= self.n_examples and all(
+            map(lambda p: p[0] == (p[1][0][0], bool(p[1][1])), zip(self._examples, examples)))
+
+    def check(self, regex_str: str) -> Tuple[List[int], int]:
+        """ Returns the indices of examples the regex disagrees with, at most one per
+        shard, or an empty list if it agrees with all of them, and the number of examples
+        the shards matched it against. The other shards stop as soon as one disagreement
+        is found. """
+        self._generation += 1
+        for conn in self._connections:
+            conn.send((self._generation, regex_str))
+        answers = list(map(lambda conn: conn.recv(), self._connections))
+        failed = list(filter(lambda i: i >= 0, map(lambda a: a[0], answers)))
+        return failed, sum(map(lambda a: a[1], answers))
+
+    def close(self):
+        """ Stops the workers and releases the shared memory. """
+        if not self.usable:
+            return
+        for conn in self._connections:
+            conn.send(None)
+        for worker in self._workers:
+            worker.join()
+        self._connections = []
+        self._workers = []
+        for shm in (self._corpus, self._offsets, self._flags):
+            shm.close()
+            shm.unlink()
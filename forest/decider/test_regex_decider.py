@@ -0,0 +1,40 @@
+import unittest
+
+from forest.dsl import Builder
+from forest.parse_examples import preprocess
+from forest.visitor import RegexInterpreter
+from .regex_decider import RegexDecider
+
+
+class TestSignature(unittest.TestCase):
+
+    def setUp(self):
+        dsl, valid, invalid, _, _, _ = preprocess([['1234567890'], ['12']], [['1a']], [])
+        self.builder = Builder(dsl)
+        self.decider = RegexDecider(RegexInterpreter(), valid, invalid)
+        self.digit = self.builder.make_apply('re', [self.builder.make_enum('RegexLit', '[0-9]')])
+
+    def _range(self, bounds: str):
+        return self.builder.make_apply('range', [self.digit,
+                                                 self.builder.make_enum('RangeLit', bounds)])
+
+    def test_equivalent(self):
+        # No substring of the examples has more than 10 digits.
+        posit = self.builder.make_apply('posit', [self.digit])
+        self.assertEqual(self.decider.signature(posit), self.decider.signature(self._range('1,10')))
+
+    def test_long_substrings(self):
+        # Only tell apart on the substrings of 9 digits, which are not examples.
+        self.assertNotEqual(self.decider.signature(self._range('1,8')),
+                            self.decider.signature(self._range('1,9')))
+
+    def test_add_example(self):
+        posit = self.builder.make_apply('posit', [self.digit])
+        self.assertEqual(self.decider.signature(posit), self.decider.signature(self._range('1,10')))
+        self.decider.add_example(['12345678901'], True)
+        self.assertNotEqual(self.decider.signature(posit),
+                            self.decider.signature(self._range('1,10')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+
+from forest.dsl import Builder
+from forest.parse_examples import preprocess
+from forest.stats import Statistics
+from forest.visitor import RegexInterpreter
+from .regex_decider import RegexDecider
+from .sharded_checker import ShardedExampleChecker
+
+stats = Statistics.get_statistics()
+
+
+class TestShardedExampleChecker(unittest.TestCase):
+
+    def setUp(self):
+        self.examples = [(['12'], True), (['345'], True), (['a1'], False), (['6'], True)]
+        self.checker = ShardedExampleChecker(self.examples, 2)
+
+    def tearDown(self):
+        self.checker.close()
+
+    def test_check(self):
+        self.assertEqual(self.checker.check('[0-9]+'), ([], 4))
+        failed, matched = self.checker.check('[0-9]{2,3}')
+        self.assertIn(3, failed)
+        self.assertGreaterEqual(matched, 1)
+
+    def test_holds(self):
+        self.assertTrue(self.checker.holds(self.examples))
+        self.assertTrue(self.checker.holds(self.examples + [(['b'], False)]))
+        self.assertFalse(self.checker.holds(self.examples[:3]))
+        self.assertFalse(self.checker.holds([(['12'], False)] + self.examples[1:]))
+
+
+class TestShardedDecider(unittest.TestCase):
+
+    def setUp(self):
+        dsl, self.valid, self.invalid, _, _, _ = \
+            preprocess([['12'], ['345'], ['6']], [['a1'], ['']], [])
+        builder = Builder(dsl)
+        digit = builder.make_apply('re', [builder.make_enum('RegexLit', '[0-9]')])
+        self.posit = builder.make_apply('posit', [digit])
+        self.decider = RegexDecider(RegexInterpreter(), self.valid, self.invalid)
+        self.decider.use_sharded_checker(2)
+
+    def tearDown(self):
+        self.decider.close()
+
+    def test_example_matches(self):
+        stats.example_matches = 0
+        self.assertFalse(self.decider.has_failed_examples(self.posit))
+        self.assertEqual(stats.example_matches, 5)
+
+    def test_reuse(self):
+        checker = self.decider.detach_checker()
+        other = RegexDecider(RegexInterpreter(), self.valid, self.invalid)
+        other.use_sharded_checker(2, checker)
+        self.assertIs(other._checker, checker)
+        self.assertFalse(other.has_failed_examples(self.posit))
+        other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
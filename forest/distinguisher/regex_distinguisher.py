@@ -5,7 +5,7 @@ from itertools import combinations
 
 import z3
 
-from forest.logger import get_logger
+from forest.logger import get_logger, lazy
 from forest.utils import check_conditions
 from forest.visitor import ToZ3, RegexInterpreter
 
@@ -23,8 +23,8 @@ class RegexDistinguisher:
         self.force_distinguish2 = False
 
     def distinguish(self, programs):
-        logger.debug(f"Distinguishing {len(programs)}: "
-                     f"{','.join(map(self._printer.eval, programs))}")
+        logger.debug("Distinguishing %s: %s", len(programs),
+                     lazy(lambda: ','.join(map(self._printer.eval, programs))))
         assert len(programs) >= 2
         if not self.force_multi_distinguish and len(programs) == 2:
             return self.distinguish2(programs[0], programs[1])
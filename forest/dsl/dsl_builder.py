@@ -1,8 +1,8 @@
 import re
 
-import forest.spec as spec
 from forest.logger import get_logger
 from forest.utils import transpose, find_all_cs
+from .dsl_cache import dsl_cache
 
 logger = get_logger('forest')
 
@@ -50,7 +50,7 @@ class DSLBuilder:
         dsl += self._predicates()
 
         logger.debug("\n" + dsl)
-        dsl = spec.parse(dsl)
+        dsl = dsl_cache.parse(dsl)
         return dsl
 
     def build_dsl(self, val_type, valid):
@@ -86,7 +86,7 @@ class DSLBuilder:
 
         logger.debug("\n" + dsl)
 
-        dsl = spec.parse(dsl)
+        dsl = dsl_cache.parse(dsl)
 
         return dsl
 
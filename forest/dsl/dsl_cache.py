@@ -0,0 +1,61 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+import forest.spec as spec
+from forest.logger import get_logger
+
+logger = get_logger('forest')
+
+
+class DSLCache:
+    """ Cache of parsed DSLs keyed by their text. Specs are stored pickled, and every lookup
+    returns a new copy, since the enumerators add predicates to the DSLs they use.
+    Optionally, the specs are also saved to a directory, so that later runs do not need
+    to import and build the parser. """
+
+    def __init__(self, path: str = ''):
+        self.path = path
+        self._entries = {}
+
+    def parse(self, dsl: str) -> spec.TyrellSpec:
+        """ Returns the spec parsed from the DSL text. """
+        entry = self._entries.get(dsl)
+        if entry is None and len(self.path) > 0:
+            entry = self._load(dsl)
+        if entry is None:
+            parsed = spec.parse(dsl)
+            entry = pickle.dumps(parsed)
+            self._entries[dsl] = entry
+            if len(self.path) > 0:
+                self._save(dsl, entry)
+            return parsed
+        self._entries[dsl] = entry
+        return pickle.loads(entry)
+
+    def _file_name(self, dsl: str) -> str:
+        return os.path.join(self.path, hashlib.sha256(dsl.encode()).hexdigest() + '.pickle')
+
+    def _load(self, dsl: str):
+        try:
+            with open(self._file_name(dsl), 'rb') as f:
+                text, entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        return entry if text == dsl else None
+
+    def _save(self, dsl: str, entry: bytes):
+        """ Write the entry to a temporary file first, so that concurrent runs never read a
+        partially written file. """
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((dsl, entry), f)
+            os.replace(tmp_path, self._file_name(dsl))
+        except OSError as e:
+            logger.warning(f'Could not save the DSL cache: {e}')
+
+
+dsl_cache = DSLCache()
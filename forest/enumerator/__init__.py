@@ -1,3 +1,4 @@
+from .bottom_up import BottomUpEnumerator
 from .dynamic_multitree import DynamicMultiTreeEnumerator
 from .ktree import KTreeEnumerator
 from .lines import LinesEnumerator
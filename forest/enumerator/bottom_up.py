@@ -0,0 +1,134 @@
+from collections import defaultdict
+from typing import Callable, Hashable, Optional
+
+from forest.spec import TyrellSpec
+from ..dsl import Node, Builder
+from ..logger import get_logger
+from ..profiler import profiler
+
+logger = get_logger('forest')
+
+
+class BottomUpEnumerator:
+    """
+    Enumerates regexes by increasing size without an SMT solver. The size of a regex is
+    its number of Regex nodes. The regexes of each size are built from the smaller regexes
+    kept so far, and a regex is only kept if no regex kept before has the same signature.
+    Regexes with the same signature are observationally equivalent, so only the first,
+    and smallest, regex of each class is returned by next and used to build larger ones.
+    """
+
+    def __init__(self, dsl: TyrellSpec, signature: Callable[[Node], Optional[Hashable]]):
+        """
+        :param signature: function from regexes to their signatures, or to None if they
+        cannot be compared, in which case every regex is kept. Regexes that match different
+        substrings of the examples must have different signatures, or the larger regexes
+        built from them are lost.
+        """
+        self.dsl = dsl
+        self._signature = signature
+        self._builder = Builder(dsl)
+        self.size = 1
+
+        regex_lits = self.dsl.get_productions_with_lhs(self.dsl.get_type('RegexLit'))
+        self._leaves = list(map(lambda p: self._make_node('re', [self._builder.make_node(p)]),
+                                regex_lits))
+        range_lit_ty = self.dsl.get_type('RangeLit')
+        self._range_lits = [] if range_lit_ty is None else \
+            list(map(self._builder.make_node, self.dsl.get_productions_with_lhs(range_lit_ty)))
+        self._not_parent = set(map(lambda p: tuple(p.args),
+                                   filter(lambda p: p.name == 'is_not_parent',
+                                          self.dsl.predicates())))
+
+        # size -> regexes of that size kept so far
+        self._bank = defaultdict(list)
+        self._signatures = set()
+        # Generator of the regexes of the current size that were not tried yet.
+        self._candidates = None
+        # Regexes returned by next, by their string, not to return them again when the
+        # equivalences are forgotten.
+        self._returned = set()
+        # When the equivalences are forgotten, the sizes up to this one are enumerated
+        # again without stopping after each size.
+        self._replay_size = 0
+
+    def _make_node(self, name: str, children):
+        return self._builder.make_node(self.dsl.get_function_production(name), children)
+
+    def _allowed(self, parent: str, child: Node) -> bool:
+        return (parent, child.name) not in self._not_parent
+
+    def _generate(self, size: int):
+        """ The regexes of the given size built from the regexes kept so far. """
+        if size == 1:
+            yield from self._leaves
+            return
+        for name in ('kleene', 'posit', 'option'):
+            if self.dsl.get_function_production(name) is None:
+                continue
+            for regex in self._bank[size - 1]:
+                if self._allowed(name, regex):
+                    yield self._make_node(name, [regex])
+        if self.dsl.get_function_production('range') is not None:
+            for regex in self._bank[size - 1]:
+                if self._allowed('range', regex):
+                    for range_lit in self._range_lits:
+                        yield self._make_node('range', [regex, range_lit])
+        for left_size in range(1, size - 1):
+            right_size = size - 1 - left_size
+            for left_idx, left in enumerate(self._bank[left_size]):
+                for right_idx, right in enumerate(self._bank[right_size]):
+                    yield self._make_node('concat', [left, right])
+                    # union is commutative and idempotent, so only one order is built.
+                    if left_size < right_size or left_size == right_size and left_idx < right_idx:
+                        yield self._make_node('union', [left, right])
+
+    def next(self) -> Optional[Node]:
+        """ The next regex of the current size, or None if there are no more. """
+        while True:
+            if self._candidates is None:
+                self._candidates = self._generate(self.size)
+            for regex in self._candidates:
+                with profiler.phase('signature'):
+                    signature = self._signature(regex)
+                if signature is not None:
+                    if signature in self._signatures:
+                        continue
+                    self._signatures.add(signature)
+                self._bank[self.size].append(regex)
+                key = str(regex)
+                if key not in self._returned:
+                    self._returned.add(key)
+                    return regex
+            if self.size >= self._replay_size:
+                logger.debug(f'Enumerator exhausted.')
+                return None
+            self.grow()
+
+    def grow(self):
+        """ Move on to the regexes of the next size. """
+        logger.info(f'{self}: kept {len(self._bank[self.size])} regexes of size {self.size}, '
+                    f'{len(self._signatures)} in total.')
+        self.size += 1
+        self._candidates = None
+
+    def update(self, predicates=None):
+        """ Regexes are never generated twice, and the pruning predicates assume a tree
+        encoding, so nothing is done. """
+        pass
+
+    def block_equivalent(self, program: Node, tree_idx: int):
+        """ Equivalent regexes are already discarded. """
+        pass
+
+    def forget_equivalences(self):
+        """ The examples changed, so regexes that were discarded as equivalent may no longer
+        be. Start over from the smallest regexes, skipping the ones already returned. """
+        self._replay_size = max(self._replay_size, self.size)
+        self.size = 1
+        self._bank = defaultdict(list)
+        self._signatures = set()
+        self._candidates = None
+
+    def __str__(self):
+        return f'BottomUp(size={self.size})'
@@ -101,11 +101,15 @@ class CaptureConditionsEnumerator:
         return op(z3_val, self.bounds[(cap_idx, cond)])
 
     def _get_s_and_s_constraint(self, cap_idx: int, captures: Iterable[str], ex: str, valid: bool):
+        s = self.ss_valid[(cap_idx, ex)] if valid else self.ss_invalid[(cap_idx, ex)]
+        if captures[cap_idx] is None:
+            # The group did not participate in the match: none of its conditions apply.
+            return s, s == z3.BoolVal(True)
         s_big_and = []
+        values = list(map(lambda c: None if c is None else int(c), captures))
         for cond in self.conditions:
-            ctr = self._get_u_implies(cond, cap_idx, list(map(int, captures)))
+            ctr = self._get_u_implies(cond, cap_idx, values)
             s_big_and.append(ctr)
-        s = self.ss_valid[(cap_idx, ex)] if valid else self.ss_invalid[(cap_idx, ex)]
         return s, s == make_z3_and(s_big_and)
 
     def _get_a_var_name(self, ex: str, valid: bool):
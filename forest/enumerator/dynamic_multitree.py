@@ -4,6 +4,7 @@ from forest.spec import TyrellSpec
 from .regex_enumerator import RegexEnumerator
 from ..dsl import Node, Builder
 from ..logger import get_logger
+from ..profiler import profiler
 
 logger = get_logger('forest')
 
@@ -208,9 +209,7 @@ class DynamicMultiTreeEnumerator(RegexEnumerator):
     def block_model(self):
         """ Block current model and all others equivalent to it """
         # block the model using only the variables that correspond to productions
-        block = list(
-            map(lambda x: self.variables[x] != self.model[x], self.variables.keys()))
-        self.z3_solver.add(z3.Or(block))
+        self.z3_solver.add(self._block_clause())
 
         # Find out if some commutative operation was used.
         # FIXME: union is hardcoded as commutative operation!
@@ -218,7 +217,7 @@ class DynamicMultiTreeEnumerator(RegexEnumerator):
         union_id = self.dsl.get_function_production("union").id
         # commutative_op_nodes contains the variables of all nodes that have id of a
         # commutative operation (in this case, it is only union)
-        commutative_op_nodes = filter(lambda x: int(str(self.model[x])) == union_id,
+        commutative_op_nodes = filter(lambda x: self.model[x] == union_id,
                                       self.variables)
 
         for x in commutative_op_nodes:
@@ -226,23 +225,7 @@ class DynamicMultiTreeEnumerator(RegexEnumerator):
             subt0 = self.trees[tree_id - 1].nodes[node_id - 1].children[0].get_subtree()
             subt1 = self.trees[tree_id - 1].nodes[node_id - 1].children[1].get_subtree()
             # block model with subtrees swapped:
-            block2 = []
-            unblocked = set(self.variables.keys())
-            for i, node in enumerate(subt0):
-                node_x = self.variables[node]
-                other_node = subt1[i]
-                block2.append(node_x != self.model[other_node])
-                unblocked.remove(node)
-
-            for i, node in enumerate(subt1):
-                node_x = self.variables[node]
-                other_node = subt0[i]
-                block2.append(node_x != self.model[other_node])
-                unblocked.remove(node)
-
-            block2 += list(map(lambda x: self.variables[x] != self.model[x], unblocked))
-
-            self.z3_solver.add(z3.Or(block2))
+            self.z3_solver.add(self._block_swapped_clause(subt0, subt1))
 
     def update(self, predicates=None):
         """
@@ -250,11 +233,13 @@ class DynamicMultiTreeEnumerator(RegexEnumerator):
         block complete model.
         """
         if predicates is not None:
-            self.resolve_predicates(predicates)
+            with profiler.phase('resolve_predicates'):
+                self.resolve_predicates(predicates)
             for pred in predicates:
                 self.dsl.add_predicate(pred.name, pred.args)
         # else:
-        self.block_model()
+        with profiler.phase('block_model'):
+            self.block_model()
 
     def build_program(self):
         result = [[] for i in range(len(self.trees))]
@@ -262,7 +247,7 @@ class DynamicMultiTreeEnumerator(RegexEnumerator):
             result[i] = [-1] * len(self.trees[i].nodes)
         for x in self.model.keys():
             tree_id, node_id = x.tree_id, x.id
-            result[tree_id - 1][node_id - 1] = int(str(self.model[x]))
+            result[tree_id - 1][node_id - 1] = self.model[x]
 
         # result contains the values of 'n' variables
         productions = [[] for i in range(len(self.trees))]
@@ -294,6 +279,9 @@ class DynamicMultiTreeEnumerator(RegexEnumerator):
 
         return concat_node
 
+    def _nodes_to_block_equivalent(self, program: Node, tree_idx: int):
+        return self.nodes_until_depth(self.depth - program.depth() + 1)
+
     def nodes_until_depth(self, depth: int):
         """ Return all nodes with depth lower than that in the argument. """
         last_node = 2 ** depth - 1
@@ -5,6 +5,7 @@ from .regex_enumerator import RegexEnumerator
 from .. import dsl as D
 from ..dsl import Node
 from ..logger import get_logger
+from ..profiler import profiler
 
 logger = get_logger('forest')
 
@@ -229,9 +230,7 @@ class KTreeEnumerator(RegexEnumerator):
     def block_model(self):
         """ Block current model and all others equivalent to it """
         # block the model using only the variables that correspond to productions
-        block = list(
-            map(lambda x: self.variables[x] != self.model[x], self.variables.keys()))
-        self.z3_solver.add(z3.Or(block))
+        self.z3_solver.add(self._block_clause())
 
         # Find out if some commutative operation was used.
         # FIXME: union is hardcoded as commutative operation!
@@ -239,7 +238,7 @@ class KTreeEnumerator(RegexEnumerator):
         union_id = self.dsl.get_function_production("union").id
         # commutative_op_nodes contains the variables of all nodes that have id of a
         # commutative operation (in this case, it is only union)
-        commutative_op_nodes = filter(lambda x: int(str(self.model[x])) == union_id,
+        commutative_op_nodes = filter(lambda x: self.model[x] == union_id,
                                       self.variables)
 
         for x in commutative_op_nodes:
@@ -247,24 +246,7 @@ class KTreeEnumerator(RegexEnumerator):
             subtree0, subtree1 = self.nodes[node_id - 1].children[0].get_subtree(), \
                                  self.nodes[node_id - 1].children[1].get_subtree()
             # block model with subtrees swapped:
-
-            block2 = []
-            unblocked = set(self.variables.keys())
-            for i, node in enumerate(subtree0):
-                node_x = self.variables[node]
-                other_node = subtree1[i]
-                block2.append(node_x != self.model[other_node])
-                unblocked.remove(node)
-
-            for i, node in enumerate(subtree1):
-                node_x = self.variables[node]
-                other_node = subtree0[i]
-                block2.append(node_x != self.model[other_node])
-                unblocked.remove(node)
-
-            block2 += list(map(lambda x: self.variables[x] != self.model[x], unblocked))
-
-            self.z3_solver.add(z3.Or(block2))
+            self.z3_solver.add(self._block_swapped_clause(subtree0, subtree1))
 
     def update(self, predicates=None):
         """
@@ -272,20 +254,23 @@ class KTreeEnumerator(RegexEnumerator):
         block complete model.
         """
         if predicates is not None:
-            self.resolve_predicates(predicates)
+            with profiler.phase('resolve_predicates'):
+                self.resolve_predicates(predicates)
             for pred in predicates:
                 if pred.name == "block_first_tree" or pred.name == "block_tree":
-                    self.block_model()
+                    with profiler.phase('block_model'):
+                        self.block_model()
                 else:
                     self.dsl.add_predicate(pred.name, pred.args)
         else:
-            self.block_model()
+            with profiler.phase('block_model'):
+                self.block_model()
 
     def build_program(self):
         result = [-1] * len(self.nodes)
         for x in self.model.keys():
             node_id = x.id
-            result[node_id - 1] = int(str(self.model[x]))
+            result[node_id - 1] = self.model[x]
 
         # code is a list with the productions
         productions = []
@@ -307,6 +292,9 @@ class KTreeEnumerator(RegexEnumerator):
 
         return builder_nodes[0]
 
+    def _nodes_to_block_equivalent(self, program: Node, tree_idx: int):
+        return self.nodes_until_depth(self.depth - program.depth() + 1)
+
     def nodes_until_depth(self, depth: int):
         """ Return all nodes with depth lower than that in the argument. """
         last_node = 2 ** depth - 1
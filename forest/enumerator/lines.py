@@ -11,6 +11,7 @@ import z3
 from forest.spec import TyrellSpec
 from .regex_enumerator import RegexEnumerator
 from .. import dsl as D
+from ..profiler import profiler
 
 logger = getLogger('forest.enumerator.smt')
 
@@ -645,7 +646,8 @@ class LinesEnumerator(RegexEnumerator):
 
     def update(self, info=None, id=None):
         self.blockedModels = 0
-        self.block_model()
+        with profiler.phase('block_model'):
+            self.block_model()
         self.totalBlockedModels += self.blockedModels
         if self.blockedModels != 0:
             logger.error('Total Blocked Models: {}'.format(self.totalBlockedModels))
@@ -702,7 +704,8 @@ class LinesEnumerator(RegexEnumerator):
 
     def next(self):
         start_time = time.time()
-        res = self.z3_solver.check()
+        with profiler.phase('check'):
+            res = self.z3_solver.check()
 
         self.solverTime += time.time() - start_time
         if res != z3.sat:
@@ -711,7 +714,8 @@ class LinesEnumerator(RegexEnumerator):
         self.model = self.z3_solver.model()
 
         if self.model is not None:
-            return self.build_program()
+            with profiler.phase('build_program'):
+                return self.build_program()
         else:
             return None
 
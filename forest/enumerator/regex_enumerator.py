@@ -1,3 +1,4 @@
+import ctypes
 from abc import ABC, abstractmethod
 from collections import deque
 from typing import Any
@@ -7,6 +8,7 @@ import z3
 from .ast import AST, ASTNode
 from ..dsl import Node, AtomNode
 from ..logger import get_logger
+from ..profiler import profiler
 
 logger = get_logger('forest')
 
@@ -17,11 +19,22 @@ class RegexEnumerator(ABC):
     def __init__(self, dsl):
         z3.Z3_DEBUG = False
         self.z3_solver = z3.Solver()
+        # Literals assumed in every check. Used to enable and disable groups of constraints
+        # without losing the rest of the encoding.
+        self.assumptions = []
+        # Guards the constraints added by block_equivalent, which only hold for the
+        # examples they were learned from. None if there are no such constraints.
+        self._equivalence_literal = None
+        self._equivalence_epoch = 0
         self.variables = {}
         self.variables_fun = []
         self.trees = []
         self.nodes = []
         self.model = None
+        # self.variables as parallel lists, rebuilt when variables are added.
+        self._variable_arrays = None
+        # (node, value) -> the literal variables[node] != value, used in blocking clauses.
+        self._block_literals = {}
 
         self.dsl = dsl
         self.max_children = self.max_children()
@@ -143,15 +156,75 @@ class RegexEnumerator(ABC):
             else:
                 logger.warning('Predicate not handled: {}'.format(pred))
 
+    def _get_variable_arrays(self):
+        """ The nodes that have a variable, their variables, and the declarations of the
+        variables, in the same order. """
+        if self._variable_arrays is None or self._variable_arrays[0] is not self.variables \
+                or len(self._variable_arrays[1]) != len(self.variables):
+            nodes = list(self.variables)
+            variables = list(map(lambda n: self.variables[n], nodes))
+            decls = list(map(lambda v: v.decl(), variables))
+            if self._variable_arrays is not None and \
+                    self._variable_arrays[0] is not self.variables:
+                self._block_literals = {}  # the nodes were replaced
+            self._variable_arrays = (self.variables, nodes, variables, decls)
+        return self._variable_arrays[1:]
+
+    def _read_model(self, model: z3.ModelRef):
+        """ Values of the variables in the model, by node. Reads them with z3's numeral
+        accessors instead of printing each one and parsing it back. """
+        nodes, variables, decls = self._get_variable_arrays()
+        ctx = model.ctx.ref()
+        value = ctypes.c_int()
+        values = []
+        for var, decl in zip(variables, decls):
+            interp = z3.Z3_model_get_const_interp(ctx, model.model, decl.ast)
+            if interp and z3.Z3_get_numeral_int(ctx, interp, value):
+                values.append(value.value)
+            else:  # not assigned by the model
+                values.append(model.eval(var, model_completion=True).as_long())
+        return dict(zip(nodes, values))
+
+    def _block_literal(self, node, value: int):
+        """ The literal variables[node] != value, created once per node and value. """
+        literal = self._block_literals.get((node, value))
+        if literal is None:
+            literal = self.variables[node] != value
+            self._block_literals[(node, value)] = literal
+        return literal
+
+    def _block_clause(self, values=None):
+        """ Clause that is false when every node takes the value given to it by values,
+        pairs of node and value that default to the current model. The disjunction is
+        built from the cached literals directly, without z3.Or's coercion of each one. """
+        if values is None:
+            values = self.model.items()
+        literals = list(map(lambda nv: self._block_literal(*nv), values))
+        args = (z3.Ast * len(literals))(*map(lambda l: l.as_ast(), literals))
+        ctx = self.z3_solver.ctx
+        return z3.BoolRef(z3.Z3_mk_or(ctx.ref(), len(literals), args), ctx)
+
+    def _block_swapped_clause(self, subtree0, subtree1):
+        """ Clause that blocks the current model with the nodes of two subtrees of the same
+        shape swapped. """
+        swapped = dict(zip(subtree0, subtree1))
+        swapped.update(zip(subtree1, subtree0))
+        return self._block_clause(map(lambda n: (n, self.model[swapped.get(n, n)]), self.model))
+
     def next(self):
-        if self.z3_solver.check() == z3.sat:
-            self.model = {}
-            for var in self.variables:
-                self.model[var] = int(str(self.z3_solver.model()[self.variables[var]]))
+        assumptions = self.assumptions
+        if self._equivalence_literal is not None:
+            assumptions = assumptions + [self._equivalence_literal]
+        with profiler.phase('check'):
+            result = self.z3_solver.check(*assumptions)
+        if result == z3.sat:
+            with profiler.phase('model'):
+                self.model = self._read_model(self.z3_solver.model())
         else:
             self.model = None
         if self.model is not None:
-            return self.build_program()
+            with profiler.phase('build_program'):
+                return self.build_program()
         else:
             logger.debug(f'Enumerator exhausted.')
             return None
@@ -178,6 +251,60 @@ class RegexEnumerator(ABC):
         block = self._block_subtree_rec(subtree, program)
         self.z3_solver.add(z3.Or(block))
 
+    def block_equivalent(self, program: Node, tree_idx: int):
+        """ Block the program, a subtree that is observationally equivalent to a smaller
+        one on the current examples, from happening in the tree tree_idx. The constraints are
+        dropped by forget_equivalences. """
+        if self._equivalence_literal is None:
+            self._equivalence_literal = z3.Bool(f'equivalence_{self._equivalence_epoch}')
+        disabled = z3.Not(self._equivalence_literal)
+        for node in self._nodes_to_block_equivalent(program, tree_idx):
+            self.z3_solver.add(z3.Or(self._block_subtree_rec(node, program) + [disabled]))
+
+    def forget_equivalences(self):
+        """ Drop the constraints added by block_equivalent, when the examples change. Their
+        literal is no longer assumed, so the solver is free to falsify it. """
+        if self._equivalence_literal is not None:
+            self._equivalence_literal = None
+            self._equivalence_epoch += 1
+
+    def _nodes_to_block_equivalent(self, program: Node, tree_idx: int):
+        """ Nodes in which block_equivalent blocks the program. By default, none. """
+        return []
+
+    def _tree_dsl(self, tree):
+        """ DSL of the productions assigned to the nodes of the given tree. """
+        return self.dsl
+
+    def seed(self, program: Node):
+        """ Hint the solver to assign the given program to the trees first. Productions are
+        matched by name, since the program may come from a DSL built for other examples.
+        Requires a z3 version that supports initial values; otherwise it does nothing. """
+        if len(program.children) != len(self.trees) or \
+                not hasattr(self.z3_solver, 'set_initial_value'):
+            return
+        for tree, head in zip(self.trees, program.children):
+            dsl = self._tree_dsl(tree)
+            productions = {str(p): p.id for p in dsl.productions()}
+            empty = next(filter(lambda p: 'Empty' in str(p), dsl.productions()), None)
+            self._seed_subtree_rec(tree.head, head, productions, empty)
+
+    def _seed_subtree_rec(self, subtree: ASTNode, program: Node, productions, empty):
+        """ Auxiliary function for seed. """
+        production_id = productions.get(str(program.production))
+        if production_id is None:
+            return
+        self.z3_solver.set_initial_value(self.variables[subtree], z3.IntVal(production_id))
+        if not subtree.has_children():
+            return
+        for child_idx, child in enumerate(subtree.children):
+            if child_idx < len(program.children):
+                self._seed_subtree_rec(child, program.children[child_idx], productions, empty)
+            elif empty is not None:
+                for node in child.get_subtree():
+                    self.z3_solver.set_initial_value(self.variables[node],
+                                                     z3.IntVal(empty.id))
+
     @abstractmethod
     def build_program(self):
         raise NotImplementedError
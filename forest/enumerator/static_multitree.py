@@ -6,6 +6,7 @@ from forest.spec import TyrellSpec
 from .regex_enumerator import RegexEnumerator
 from ..dsl import Node, Builder
 from ..logger import get_logger
+from ..profiler import profiler
 
 logger = get_logger('forest')
 
@@ -13,7 +14,8 @@ logger = get_logger('forest')
 # FIXME: Currently this enumerator requires an "Empty" production to function properly
 class StaticMultiTreeEnumerator(RegexEnumerator):
 
-    def __init__(self, main_dsl: TyrellSpec, tree_dsls: List[TyrellSpec], depth):
+    def __init__(self, main_dsl: TyrellSpec, tree_dsls: List[TyrellSpec], depth,
+                 incremental=False):
         super().__init__(main_dsl)
         # self.main_dsl = self.dsl (defined in superclass)
         self.main_dsl = main_dsl
@@ -24,6 +26,32 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
             raise ValueError(f'Depth must be larger or equal to 2: {depth}')
         self.depth = depth
 
+        # In incremental mode, the constraints that only hold for the current depth are
+        # guarded by this literal, so that the encoding can later be deepened.
+        self.incremental = incremental
+        self._depth_literal = None
+        if self.incremental:
+            self._set_depth_literal()
+        # Nodes up to this depth were already encoded before the last call to deepen.
+        self._encoded_depth = 0
+        # True while deepen re-resolves predicates that were resolved for a smaller depth.
+        self._replaying = False
+
+        self._build_trees()
+
+        self._create_variables(self.z3_solver)
+        self._create_output_constraints(self.z3_solver)
+        self._create_leaf_constraints(self.z3_solver)
+        self._create_children_constraints(self.z3_solver)
+        self._create_union_constraints()
+        self.resolve_predicates(self.main_dsl.predicates())
+
+        logger.info(str(self) + f", variables {len(self.variables)}")
+
+    def _build_trees(self):
+        """ Build one k-tree of the current depth per field. """
+        self.trees = []
+        self.nodes = []
         for i in range(self.length):
             tree = self.build_k_tree(self.max_children, self.depth, i + 1)
             self.trees.append(tree)
@@ -32,15 +60,56 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
         assert len(self.trees) == self.length
         assert len(self.nodes) == (2 ** self.depth - 1) * self.length
 
+    def _set_depth_literal(self):
+        self._depth_literal = z3.Bool(f'depth_{self.depth}')
+        self.assumptions = [self._depth_literal]
+
+    def _add_depth_constraint(self, constraint):
+        """ Add a constraint that is only valid for the current depth. """
+        if self._depth_literal is None:
+            self.z3_solver.add(constraint)
+        else:
+            self.z3_solver.add(z3.Implies(self._depth_literal, constraint))
+
+    def _learned_predicates(self):
+        """ Predicates added to the tree DSLs by update. """
+        learned = []
+        for dsl in self.tree_dsls:
+            learned.extend(filter(lambda p: p.name != 'is_not_parent', dsl.predicates()))
+        return learned
+
+    def deepen(self):
+        """
+        Increase the depth of every tree by one, reusing the current encoding. Node
+        variables are named by position, so the variables of the smaller trees are kept.
+        Blocked models and learned predicates remain valid, since every model of the
+        smaller trees is a model of the deeper trees in which the new nodes are empty.
+        Only the constraints guarded by the previous depth literal are dropped.
+        """
+        if not self.incremental:
+            raise ValueError('Only incremental enumerators can be deepened.')
+        self._encoded_depth = self.depth
+        self.depth += 1
+        self._set_depth_literal()
+        self.model = None
+
+        self._build_trees()
+        self.variables = {}
         self._create_variables(self.z3_solver)
-        self._create_output_constraints(self.z3_solver)
         self._create_leaf_constraints(self.z3_solver)
         self._create_children_constraints(self.z3_solver)
         self._create_union_constraints()
+
+        self._replaying = True
         self.resolve_predicates(self.main_dsl.predicates())
+        self.resolve_predicates(self._learned_predicates())
+        self._replaying = False
 
         logger.info(str(self) + f", variables {len(self.variables)}")
 
+    def _tree_dsl(self, tree):
+        return self.tree_dsls[tree.id - 1]
+
     def _create_variables(self, solver):
         """ Create one n-variable per node. """
         for tree in self.trees:
@@ -48,7 +117,8 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
             for node in tree.nodes:
                 v = z3.Int(self._get_n_var_name(node))
                 self.variables[node] = v
-                solver.add(z3.And(v >= 0, v < dsl.num_productions()))
+                if node.depth > self._encoded_depth:
+                    solver.add(z3.And(v >= 0, v < dsl.num_productions()))
 
         assert len(self.variables) == len(self.nodes)
 
@@ -77,7 +147,7 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
                 if node.children is None:
                     big_or = list(
                         map(lambda l: self.variables[node] == l.id, leaf_productions))
-                    solver.add(z3.Or(big_or))
+                    self._add_depth_constraint(z3.Or(big_or))
 
     def _create_children_constraints(self, solver):
         """ Children have the correct type according to parent's
@@ -85,7 +155,7 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
         for tree in self.trees:
             dsl = self.tree_dsls[tree.id - 1]
             for parent in tree.nodes:
-                if parent.has_children():
+                if parent.has_children() and parent.depth >= self._encoded_depth:
                     for prod in dsl.productions():
                         for child_idx in range(0, len(parent.children)):
                             child_type = 'Empty'
@@ -100,32 +170,34 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
                             solver.add(z3.Or(big_or))
 
     def _create_union_constraints(self):
-        """ Prevent union of twice the same subtree: (A|A) """
+        """ Break the commutativity of union: the productions of its first subtree must be
+        lexicographically smaller than those of its second one. This only leaves one order
+        of each union, and also prevents union of twice the same subtree: (A|A) """
         for tree in self.trees:
             dsl = self.tree_dsls[tree.id - 1]
+            union = dsl.get_function_production("union")
+            if union is None:
+                continue
             for node in tree.nodes:
                 if not node.has_children():
                     continue
-                test2 = node.children[0].children is None or len(
-                    node.children[0].children) == 0
-                test3 = node.children[1].children is None or len(
-                    node.children[1].children) == 0
-                if test2 or test3: continue
-
-                node_var = self.variables[node]
-                if dsl.get_function_production("union") is None: return
-                union_id = dsl.get_function_production("union").id
-                node_is_union = node_var == z3.IntVal(union_id)
+                if not node.children[0].has_children() or not node.children[1].has_children():
+                    continue
 
+                node_is_union = self.variables[node] == z3.IntVal(union.id)
                 subtree0, subtree1 = node.children[0].get_subtree(), \
                                      node.children[1].get_subtree()
-                big_or = []
-                for i in range(len(subtree0)):
-                    var_i0 = self.variables[subtree0[i]]
-                    var_i1 = self.variables[subtree1[i]]
-                    big_or.append(var_i0 != var_i1)
-
-                self.z3_solver.add(z3.Implies(node_is_union, z3.Or(big_or)))
+                self._add_depth_constraint(z3.Implies(node_is_union,
+                                                      self._lex_less(subtree0, subtree1)))
+
+    def _lex_less(self, subtree0, subtree1):
+        """ Constraint that the productions of subtree0 come before those of subtree1, of the
+        same shape, comparing node by node in pre-order. """
+        less = z3.BoolVal(False)
+        for node0, node1 in reversed(list(zip(subtree0, subtree1))):
+            var0, var1 = self.variables[node0], self.variables[node1]
+            less = z3.Or(var0 < var1, z3.And(var0 == var1, less))
+        return less
 
     def _resolve_is_not_parent_predicate(self, pred):
         self._check_arg_types(pred, [str, str])
@@ -147,7 +219,7 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
 
             for node in tree.nodes:
                 # not a leaf node
-                if node.children is not None:
+                if node.children is not None and node.depth >= self._encoded_depth:
                     ctr_children = []
                     for p in range(0, len(child_pos)):
                         ctr_children.append(
@@ -161,22 +233,21 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
         self._check_arg_types(pred, [Node, int])
         program = pred.args[0]
         tree_idx = pred.args[1]
-        self.tree_dsls[tree_idx].add_predicate(pred.name, pred.args)
 
         # We want to run block_subtree only for nodes in the tree in which the program
         # originally occurred.
-        for node in self.nodes_until_depth(self.depth - program.depth() + 1,
-                                           tree_idx):
+        for node in self._nodes_to_block(self.depth - program.depth() + 1, tree_idx):
             self.block_subtree(node, program)
 
     def _resolve_block_tree_predicate(self, pred):
         self._check_arg_types(pred, [Node, int])
         program = pred.args[0]
         tree_idx = pred.args[1]
-        self.tree_dsls[tree_idx].add_predicate(pred.name, pred.args)
 
         if self.depth < program.depth():
             return
+        if self._replaying and self.depth - 1 >= program.depth():
+            return  # already blocked in the smaller tree
 
         self.block_subtree(self.trees[tree_idx].head, program)
 
@@ -184,10 +255,11 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
         self._check_arg_types(pred, [Node, int])
         program = pred.args[0]
         tree_idx = pred.args[1]
-        self.tree_dsls[0].add_predicate(pred.name, pred.args)
 
         if self.depth < program.depth():
             return
+        if self._replaying and self.depth - 1 >= program.depth():
+            return  # already blocked in the smaller tree
         node = self.trees[0].head
         self.block_subtree(node, program)
 
@@ -195,7 +267,6 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
         self._check_arg_types(pred, [Node, int])
         program = pred.args[0]
         tree_idx = pred.args[1]
-        self.tree_dsls[tree_idx].add_predicate(pred.name, pred.args)
 
         big_or = []
         for node in self.nodes_until_depth(self.depth - program.depth() + 1,
@@ -203,13 +274,13 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
             big_or.append(
                 self.variables[node] == z3.IntVal(program.production.id))
 
-        self.z3_solver.add(z3.Or(big_or))
+        # The character may occur in nodes that are only added by deepen.
+        self._add_depth_constraint(z3.Or(big_or))
 
     def _resolve_block_range_lower_bound_predicate(self, pred):
         self._check_arg_types(pred, [Node, int])
         program = pred.args[0]
         tree_idx = pred.args[1]
-        self.tree_dsls[tree_idx].add_predicate(pred.name, pred.args)
 
         # block all programs
         bounds = program.args[1].data.split(',')
@@ -224,7 +295,7 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
             program_to_block.args[1] = range_node
             # We want to run block_subtree only for nodes in the tree in which
             # the program originally occurred.
-            for node in self.nodes_until_depth(
+            for node in self._nodes_to_block(
                     self.depth - program_to_block.depth() + 1, tree_idx):
                 self.block_subtree(node, program_to_block)
 
@@ -232,7 +303,6 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
         self._check_arg_types(pred, [Node, int])
         program = pred.args[0]
         tree_idx = pred.args[1]
-        self.tree_dsls[tree_idx].add_predicate(pred.name, pred.args)
 
         # block all programs
 
@@ -248,66 +318,40 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
             program_to_block.args[1] = range_node
             # We want to run block_subtree only for nodes in the tree in which
             # the program originally occurred.
-            for node in self.nodes_until_depth(
+            for node in self._nodes_to_block(
                     self.depth - program_to_block.depth() + 1, tree_idx):
                 self.block_subtree(node, program_to_block)
 
     def block_model(self):
-        """ Block current model and all others equivalent to it """
+        """ Block current model. The models equivalent to it by union commutativity are
+        never generated, thanks to the union constraints. """
         # block the model using only the variables that correspond to productions
-        to_block = list(
-            map(lambda x: self.variables[x] != self.model[x], self.variables.keys()))
-        self.z3_solver.add(z3.Or(to_block))
+        self.z3_solver.add(self._block_clause())
 
-        # Find out if some commutative operation was used.
-        # FIXME: union is hardcoded as commutative operation!
-        if self.main_dsl.get_function_production("union") is None: return
+    def fix_heads(self, productions: List[int]):
+        """ Only enumerate the programs in which the head of the i-th tree has the i-th
+        production id, for each of the given productions. """
+        for tree, production_id in zip(self.trees, productions):
+            self.z3_solver.add(self.variables[tree.head] == z3.IntVal(production_id))
 
-        # commutative_op_nodes contains the variables of all nodes that have id
-        # of a commutative operation (in this case, it is only union)
-        commutative_op_nodes = []
-        for tree in self.trees:
-            dsl = self.tree_dsls[tree.id - 1]
-            union = dsl.get_function_production("union")
-            if union is None:
-                continue
-            union_id = union.id
-            commutative_op_nodes.extend(filter(
-                lambda n: int(str(self.model[n])) == union_id, tree.nodes))
-
-        for x in commutative_op_nodes:
-            tree_id, node_id = x.tree_id, x.id
-            subtree0, subtree1 = self.trees[tree_id - 1].nodes[node_id - 1] \
-                                     .children[0].get_subtree(), \
-                                 self.trees[tree_id - 1].nodes[node_id - 1] \
-                                     .children[1].get_subtree()
-
-            # block model with subtrees swapped:
-            block2 = []
-            unblocked = set(self.variables.keys())
-            for i, node in enumerate(subtree0):
-                node_x = self.variables[node]
-                other_node = subtree1[i]
-                block2.append(node_x != self.model[other_node])
-                unblocked.remove(node)
-
-            for i, node in enumerate(subtree1):
-                node_x = self.variables[node]
-                other_node = subtree0[i]
-                block2.append(node_x != self.model[other_node])
-                unblocked.remove(node)
-
-            block2 += list(
-                map(lambda x: self.variables[x] != self.model[x], unblocked))
-            self.z3_solver.add(z3.Or(block2))
+    def learn(self, predicates):
+        """ Resolve predicates learned elsewhere, without blocking the current model. """
+        with profiler.phase('resolve_predicates'):
+            self.resolve_predicates(predicates)
+        # Keep the predicates in the tree DSLs, so that enumerators of larger depths
+        # can use them.
+        for pred in predicates:
+            tree_idx = 0 if pred.name == 'block_first_tree' else pred.args[1]
+            self.tree_dsls[tree_idx].add_predicate(pred.name, pred.args)
 
     def update(self, predicates=None):
         """
         :param predicates: information about the program. If None, enumerator will block complete model.
         """
         if predicates is not None:
-            self.resolve_predicates(predicates)
-        self.block_model()
+            self.learn(predicates)
+        with profiler.phase('block_model'):
+            self.block_model()
 
     def build_program(self):
         result = [[] for i in range(len(self.trees))]
@@ -315,7 +359,7 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
             result[i] = [-1] * len(self.trees[i].nodes)
         for x in self.model.keys():
             tree_id, node_id = x.tree_id, x.id
-            result[tree_id - 1][node_id - 1] = int(str(self.model[x]))
+            result[tree_id - 1][node_id - 1] = self.model[x]
 
         # result contains the values of 'n' variables
         productions = [[] for i in range(len(self.trees))]
@@ -352,12 +396,23 @@ class StaticMultiTreeEnumerator(RegexEnumerator):
 
         return concat_node
 
+    def _nodes_to_block_equivalent(self, program: Node, tree_idx: int):
+        return self.nodes_until_depth(self.depth - program.depth() + 1, tree_idx)
+
     def nodes_until_depth(self, depth: int, tree_idx):
         """ Return all nodes with depth lower than that in the argument. """
         last_node = 2 ** depth - 1
         ret = filter(lambda n: n.id <= last_node, self.trees[tree_idx].nodes)
         return ret
 
+    def _nodes_to_block(self, depth: int, tree_idx):
+        """ Nodes in which a predicate must be enforced. When replaying predicates
+        after deepen, the nodes of the smaller tree are already constrained. """
+        nodes = self.nodes_until_depth(depth, tree_idx)
+        if self._replaying:
+            nodes = filter(lambda n: n.depth == depth, nodes)
+        return nodes
+
     @staticmethod
     def _get_n_var_name(node):
         return f'n{node.tree_id}_{node.id}'
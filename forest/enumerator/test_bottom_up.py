@@ -0,0 +1,41 @@
+import unittest
+
+from forest.decider import RegexDecider
+from forest.parse_examples import preprocess
+from forest.visitor import RegexInterpreter
+from .bottom_up import BottomUpEnumerator
+
+
+class TestBottomUpEnumerator(unittest.TestCase):
+
+    def _enumerate(self, valid, invalid, max_size):
+        dsl, valid, invalid, _, _, _ = preprocess(valid, invalid, [])
+        decider = RegexDecider(RegexInterpreter(), valid, invalid)
+        enumerator = BottomUpEnumerator(dsl, decider.signature)
+        printer = RegexInterpreter()
+        regexes = []
+        while enumerator.size <= max_size:
+            regex = enumerator.next()
+            if regex is None:
+                enumerator.grow()
+            else:
+                regexes.append(printer.eval(regex))
+        return regexes
+
+    def test_equivalent_regexes(self):
+        regexes = self._enumerate([['1234'], ['12']], [['1a']], 2)
+        # [0-9]+ and [0-9]{1,4} match the same substrings of the examples.
+        self.assertIn('[0-9]+', regexes)
+        self.assertNotIn('[0-9]{1,4}', regexes)
+        self.assertEqual(len(regexes), len(set(regexes)))
+
+    def test_long_substrings(self):
+        # [0-9]{1,8} and [0-9]{1,9} only differ on the substrings of 9 digits, which a
+        # larger regex can match.
+        regexes = self._enumerate([['1234567890'], ['12']], [['1a']], 2)
+        self.assertIn('[0-9]{1,8}', regexes)
+        self.assertIn('[0-9]{1,9}', regexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,19 @@
+import unittest
+
+from .capture_conditions import CaptureConditionsEnumerator
+
+
+class TestCaptureConditionsEnumerator(unittest.TestCase):
+
+    def test_unmatched_group(self):
+        # The second group does not participate in the match of '5', so its conditions
+        # do not constrain that example.
+        enumerator = CaptureConditionsEnumerator(r'(\d+)(?:-(\d+))?', 2,
+                                                 [['5'], ['3-7'], ['1-9']], [['3-20']])
+        conditions = enumerator.next()
+        self.assertIsNotNone(conditions)
+        self.assertTrue(all(map(lambda c: c[0] == 1, conditions)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from forest.dsl.dsl_builder import DSLBuilder
+from forest.parse_examples import preprocess
+from forest.visitor import RegexInterpreter
+from .static_multitree import StaticMultiTreeEnumerator
+
+
+class TestStaticMultiTreeEnumerator(unittest.TestCase):
+
+    def setUp(self):
+        self.main_dsl, valid, invalid, _, _, _ = preprocess([['ab'], ['b']], [['c']], [])
+        self.dsls = DSLBuilder(['regex'], valid, invalid).build()
+        self.printer = RegexInterpreter()
+
+    def _enumerate(self, enumerator):
+        programs = []
+        while True:
+            program = enumerator.next()
+            if program is None:
+                return programs
+            programs.append(self.printer.eval(program))
+            enumerator.update()
+
+    def test_union_commutativity(self):
+        programs = self._enumerate(StaticMultiTreeEnumerator(self.main_dsl, self.dsls, 3))
+        unions = list(filter(lambda p: p.startswith('(?:') and '|' in p, programs))
+        self.assertGreater(len(unions), 0)
+        self.assertEqual(len(programs), len(set(programs)))
+        for union in unions:
+            left, right = union[3:-1].split('|')
+            self.assertNotEqual(left, right)
+            self.assertNotIn(f'(?:{right}|{left})', programs)
+
+    def test_incremental(self):
+        programs = self._enumerate(StaticMultiTreeEnumerator(self.main_dsl, self.dsls, 3))
+        enumerator = StaticMultiTreeEnumerator(self.main_dsl, self.dsls, 2, incremental=True)
+        incremental = self._enumerate(enumerator)
+        enumerator.deepen()
+        incremental += self._enumerate(enumerator)
+        self.assertEqual(len(incremental), len(set(incremental)))
+        self.assertEqual(set(programs), set(incremental))
+
+    def test_deepen_not_incremental(self):
+        enumerator = StaticMultiTreeEnumerator(self.main_dsl, self.dsls, 2)
+        with self.assertRaises(ValueError):
+            enumerator.deepen()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -40,6 +40,22 @@ _click_handler = _ClickHandler()
 _click_handler.formatter = _ColorFormatter()
 
 
+class lazy:
+    """ Log argument that calls func(*args) only when the message is formatted, which
+    logging does only if the level of the message is enabled:
+
+        logger.debug('Generated: %s', lazy(printer.eval, program))
+    """
+    __slots__ = ('_func', '_args')
+
+    def __init__(self, func, *args):
+        self._func = func
+        self._args = args
+
+    def __str__(self):
+        return str(self._func(*self._args))
+
+
 def get_logger(name):
     """Return a colorful logger with the given name"""
     logger = logging.getLogger(name)
@@ -1,12 +1,16 @@
+import gzip
+import mmap
+import os
+import random
 import re
-from typing import Tuple, List
+from typing import Tuple, List, Iterator, Iterable, Any
 
 from termcolor import colored
 
 from forest.dsl.dsl_builder import DSLBuilder
 from forest.logger import get_logger
 from forest.spec import TyrellSpec
-from forest.utils import is_regex
+from forest.utils import is_regex, diverse_by_shape, find_all_cs
 
 logger = get_logger('forest')
 
@@ -57,99 +61,167 @@ def show(valid, invalid, condition_invalid, ground_truth: str):
     print(colored(ground_truth, "green"))
 
 
-def preprocess(valid, invalid, cond_invalid, sketch=False) \
-        -> Tuple[TyrellSpec, List[List], List[List], List[List], List[List], List[str]]:
-    """  returns dsl, valid_examples, invalid_examples, captures, and type_validation """
-    type_validation = ["regex"]
-    if len(valid) == 0:
-        raise ValueError("No valid examples!")
+def split_captures(valid, invalid, cond_invalid) \
+        -> Tuple[List[List], List[List], List[List], List[List]]:
+    """ returns valid_examples, invalid_examples, cond_invalid and the captures of the valid
+    examples """
     if isinstance(valid[0], str):
         valid = list(map(lambda v: [v], valid))
-    if isinstance(invalid[0], str):
+    if invalid and isinstance(invalid[0], str):
         invalid = list(map(lambda v: [v], invalid))
     if cond_invalid and isinstance(cond_invalid[0], str):
         cond_invalid = list(map(lambda v: [v], cond_invalid))
     # logger.info("Assuming types: " + str(type_validation))
     captures = list(map(lambda x: x[1:], valid))
     valid = list(map(lambda x: [x[0]], valid))
+    return valid, invalid, cond_invalid, captures
+
+
+def preprocess(valid, invalid, cond_invalid, sketch=False) \
+        -> Tuple[TyrellSpec, List[List], List[List], List[List], List[List], List[str]]:
+    """  returns dsl, valid_examples, invalid_examples, captures, and type_validation """
+    type_validation = ["regex"]
+    if len(valid) == 0:
+        raise ValueError("No valid examples!")
+    valid, invalid, cond_invalid, captures = split_captures(valid, invalid, cond_invalid)
     builder = DSLBuilder(type_validation, valid, invalid, sketch)
     dsl = builder.build()[0]
 
     return dsl, valid, invalid, cond_invalid, captures, type_validation
 
 
-def parse_file(filename):
-    logger.info("Parsing examples from file " + filename)
-    invalid_exs = []
-    valid_exs = []
-    condition_invalid_exs = []
-    ground_truth = ''
-    with open(filename, "r") as in_file:
-        next_line = in_file.readline()
-        while next_line and not next_line.startswith("++"):
-            # discard comments before examples
-            next_line = in_file.readline()
-
-        next_line = in_file.readline()  # skip line with "++"
-        while next_line and not next_line.startswith("--"):
-            next_line = next_line.rstrip()
-            exs = read_example(filename, next_line)
-            valid_exs.extend(exs)
-            next_line = in_file.readline()
-
-        next_line = in_file.readline()  # skip line with "--"
-        while next_line and not next_line.startswith("+-") and not next_line.startswith("**"):
-            next_line = next_line.rstrip()
-            exs = read_example(filename, next_line)
-            invalid_exs.extend(exs)
-            next_line = in_file.readline()
-
-        if next_line.startswith("+-"):
-            next_line = in_file.readline()  # skip line with "+-"
-            while next_line and not next_line.startswith("**"):
-                next_line = next_line.rstrip()
-                exs = read_example(filename, next_line)
-                condition_invalid_exs.extend(exs)
-                next_line = in_file.readline()
-
-        while next_line:
-            next_line = next_line.rstrip()
-            if is_regex(next_line):
-                ground_truth = next_line
+def deduplicate(valid, invalid) -> Tuple[List[List], List[List]]:
+    """ Collapses the examples with the same shape, keeping those needed for each shape to
+    have every character that its examples have at each position, so that literals and
+    ranges are still extracted from them. Returns the kept valid examples, with their
+    captures, and invalid examples. The examples that are dropped may still tell the
+    solutions apart, so these must be checked against all of them. """
+    valid_idxs = _keep_common_substrings(valid, diverse_by_shape(valid))
+    invalid_idxs = diverse_by_shape(invalid)
+    total = len(valid) + len(invalid)
+    kept = len(valid_idxs) + len(invalid_idxs)
+    logger.info(f'Deduplicated {total} examples into {kept} '
+                f'(compression ratio {round(total / max(kept, 1), 2)}).')
+    return list(map(lambda i: valid[i], valid_idxs)), \
+           list(map(lambda i: invalid[i], invalid_idxs))
+
+
+def _keep_common_substrings(examples, idxs):
+    """ Adds to the examples in idxs one that lacks each substring common to all of them,
+    until they have the same common substrings as all the examples. """
+    idxs = list(idxs)
+    while True:
+        missing = None
+        for cs in find_all_cs(list(map(lambda i: examples[i][0], idxs))):
+            missing = next(filter(lambda i: cs not in examples[i][0], range(len(examples))),
+                           None)
+            if missing is not None:
                 break
-            next_line = in_file.readline()
+        if missing is None:
+            return sorted(idxs)
+        idxs.append(missing)
 
-    return valid_exs, invalid_exs, condition_invalid_exs, ground_truth
+
+def parse_file(filename, max_examples=-1, use_mmap=False):
+    logger.info("Parsing examples from file " + filename)
+    return read_examples(stream_file(filename, use_mmap), max_examples)
 
 
-def parse_resnax(filename):
+def parse_resnax(filename, max_examples=-1, use_mmap=False):
     logger.info("Parsing examples from file " + filename)
+    valid_exs, invalid_exs, _, ground_truth = \
+        read_examples(stream_resnax(filename, use_mmap), max_examples)
+    return valid_exs, invalid_exs, ground_truth
 
-    invalid_exs = []
-    valid_exs = []
-    ground_truth_next = False
+
+def read_examples(stream: Iterable[Tuple[str, Any]], max_examples=-1) \
+        -> Tuple[List[List], List[List], List[List], str]:
+    """ Collects the examples yielded by stream_file or stream_resnax. If max_examples is
+    positive, keeps a uniform sample of at most max_examples valid and invalid examples,
+    chosen by reservoir sampling so that only the sample is held in memory. """
+    examples = {'valid': [], 'invalid': [], 'condition_invalid': []}
+    seen = {'valid': 0, 'invalid': 0, 'condition_invalid': 0}
     ground_truth = ''
-    with open(filename, "r") as in_file:
-        for next_line in in_file:
-            next_line = next_line.rstrip()
-            if ground_truth_next:
-                ground_truth = next_line
-                ground_truth_next = False
-                continue
-            ex, valid = read_resnax_example(next_line)
-            if ex is None:
-                if len(next_line) > 2 and not next_line.startswith("//"):
-                    print(" ", next_line)
-                elif next_line.startswith('// gt') or next_line.startswith(
-                        '// ground truth'):
-                    ground_truth_next = True
-                continue
-            if valid:
-                valid_exs.append([ex])
-            else:
-                invalid_exs.append([ex])
+    for kind, ex in stream:
+        if kind == 'ground_truth':
+            ground_truth = ex
+            continue
+        reservoir = examples[kind]
+        seen[kind] += 1
+        if max_examples <= 0 or kind == 'condition_invalid' or len(reservoir) < max_examples:
+            reservoir.append(ex)
+        else:
+            idx = random.randrange(seen[kind])
+            if idx < max_examples:
+                reservoir[idx] = ex
+    return examples['valid'], examples['invalid'], examples['condition_invalid'], ground_truth
 
-    return valid_exs, invalid_exs, ground_truth
+
+def stream_file(filename, use_mmap=False) -> Iterator[Tuple[str, Any]]:
+    """ Yields the examples in filename one at a time, as (kind, example) pairs, where kind
+    is 'valid', 'invalid', 'condition_invalid' or 'ground_truth'. """
+    section = None
+    for next_line in read_lines(filename, use_mmap):
+        if section is None:
+            # discard comments before examples
+            if next_line.startswith("++"):
+                section = 'valid'
+            continue
+        if section == 'valid' and next_line.startswith("--"):
+            section = 'invalid'
+            continue
+        if section == 'invalid' and next_line.startswith("+-"):
+            section = 'condition_invalid'
+            continue
+        if section in ('invalid', 'condition_invalid') and next_line.startswith("**"):
+            section = 'ground_truth'
+            continue
+
+        next_line = next_line.rstrip()
+        if section == 'ground_truth':
+            if is_regex(next_line):
+                yield section, next_line
+                return
+        else:
+            for ex in read_example(filename, next_line):
+                yield section, ex
+
+
+def stream_resnax(filename, use_mmap=False) -> Iterator[Tuple[str, Any]]:
+    """ Same as stream_file, for files in the resnax format. """
+    ground_truth_next = False
+    for next_line in read_lines(filename, use_mmap):
+        next_line = next_line.rstrip()
+        if ground_truth_next:
+            yield 'ground_truth', next_line
+            ground_truth_next = False
+            continue
+        ex, valid = read_resnax_example(next_line)
+        if ex is None:
+            if len(next_line) > 2 and not next_line.startswith("//"):
+                print(" ", next_line)
+            elif next_line.startswith('// gt') or next_line.startswith(
+                    '// ground truth'):
+                ground_truth_next = True
+            continue
+        yield 'valid' if valid else 'invalid', [ex]
+
+
+def read_lines(filename, use_mmap=False) -> Iterator[str]:
+    """ Yields the lines of filename. Files ending in .gz are decompressed on the fly. """
+    if filename.endswith('.gz'):
+        with gzip.open(filename, "rt") as in_file:
+            yield from in_file
+    elif use_mmap:
+        if os.path.getsize(filename) == 0:
+            return  # empty files cannot be memory-mapped
+        with open(filename, "rb") as in_file, \
+                mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b''):
+                yield line.decode()
+    else:
+        with open(filename, "r") as in_file:
+            yield from in_file
 
 
 def read_example(filename, next_line):
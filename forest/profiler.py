@@ -0,0 +1,95 @@
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+
+class _Phase:
+    """ Context manager timing one phase of the search. """
+    __slots__ = ('_profiler', '_name', '_start')
+
+    def __init__(self, profiler, name: str):
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.
+
+    def __enter__(self):
+        self._profiler._stack.append(self._name)
+        self._profiler._children_times.append(0.)
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self._profiler._record(time.perf_counter() - self._start)
+
+
+class Profiler:
+    """ Opt-in profiler of the phases of each iteration of the regex search: SMT checks,
+    model extraction, program building, printing, compiling and matching regexes, pruning
+    analysis and adding constraints. Phases nest, and are recorded both per name, as
+    histograms of their durations, and per stack of enclosing phases, as self times in
+    the folded format read by flamegraph.pl and speedscope. """
+
+    def __init__(self):
+        self.enabled = False
+        self._stack = []
+        self._children_times = []
+        self._calls = defaultdict(int)
+        self._total_times = defaultdict(float)
+        self._max_times = defaultdict(float)
+        # phase name -> k -> number of calls that took [2^(k-1), 2^k) microseconds
+        self._histograms = defaultdict(lambda: defaultdict(int))
+        # 'outer;inner' stack -> time spent in inner but not in its nested phases
+        self._self_times = defaultdict(float)
+
+    def phase(self, name: str):
+        """ Times the with block as the given phase, if the profiler is enabled. """
+        if not self.enabled:
+            return nullcontext()
+        return _Phase(self, name)
+
+    def _record(self, elapsed: float):
+        stack = ';'.join(self._stack)
+        name = self._stack.pop()
+        children_time = self._children_times.pop()
+        if len(self._children_times) > 0:
+            self._children_times[-1] += elapsed
+        self._self_times[stack] += elapsed - children_time
+        self._calls[name] += 1
+        self._total_times[name] += elapsed
+        self._max_times[name] = max(self._max_times[name], elapsed)
+        self._histograms[name][int(elapsed * 1e6).bit_length()] += 1
+
+    def reset(self):
+        """ Discard the recorded times, to profile again in the same process. """
+        self.__init__()
+
+    def dump_folded(self, path: str):
+        """ Write the self time of each stack of phases, in microseconds, in the folded
+        format: one 'outer;inner time' line per stack. """
+        with open(path, 'w') as f:
+            for stack, self_time in sorted(self._self_times.items()):
+                f.write(f'{stack} {round(self_time * 1e6)}\n')
+
+    def __str__(self):
+        if len(self._calls) == 0:
+            return 'Profile: no phases recorded.'
+        ret = 'Profile:\n'
+        ret += f'  {"Phase":<20} {"Calls":>9} {"Total (s)":>10} {"Mean (us)":>10} ' \
+               f'{"Max (us)":>10}\n'
+        by_time = sorted(self._calls, key=lambda n: self._total_times[n], reverse=True)
+        for name in by_time:
+            total = self._total_times[name]
+            ret += f'  {name:<20} {self._calls[name]:>9} {round(total, 3):>10} ' \
+                   f'{round(total / self._calls[name] * 1e6, 1):>10} ' \
+                   f'{round(self._max_times[name] * 1e6):>10}\n'
+        for name in by_time:
+            ret += f'  {name} (us):\n'
+            histogram = self._histograms[name]
+            most = max(histogram.values())
+            for k in range(min(histogram), max(histogram) + 1):
+                low = 0 if k == 0 else 1 << (k - 1)
+                bar = '#' * round(40 * histogram[k] / most)
+                ret += f'    {f"[{low}, {1 << k})":>18} {histogram[k]:>9} {bar}\n'
+        return ret
+
+
+profiler = Profiler()
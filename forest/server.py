@@ -0,0 +1,283 @@
+"""
+Synthesis server. Keeps a pool of worker processes, with forest already imported, that
+synthesize the example sets received through a local JSON API:
+
+    POST /requests               submit examples, returns {"id": ...}
+    GET  /requests/<id>          status, pending question, solution and stats
+    POST /requests/<id>/answer   answer the pending question, {"answer": "yes"}
+
+Example sets are JSON objects with the lists "valid", "invalid" and "condition_invalid",
+an optional "ground_truth" and an optional "configuration" object with Configuration
+fields. A valid example is a string or a list with the string followed by its captures.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+import uuid
+from dataclasses import fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from signal import signal, SIGINT, SIGTERM, SIG_IGN
+
+from forest.configuration import Configuration
+from forest.logger import get_logger
+from forest.stats import Statistics
+from forest.synthesizer import synthesize_examples
+from forest.utils import conditions_to_str
+from forest.visitor import RegexInterpreter
+
+logger = get_logger('forest')
+stats = Statistics.get_statistics()
+
+# Configuration fields that requests cannot set.
+_reserved_fields = ('log_path', 'cache_path', 'dsl_cache_path', 'profile_path', 'warm_start',
+                    'ask', 'die')
+
+
+def _make_configuration(options: dict) -> Configuration:
+    allowed = set(map(lambda f: f.name, fields(Configuration))) - set(_reserved_fields)
+    unknown = set(options) - allowed
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown configuration fields: {", ".join(sorted(unknown))}')
+    return Configuration(**options)
+
+
+def _synthesize_request(payload: dict, ask):
+    """ Synthesize a regex for the examples of a request, asking the distinguishing
+    questions through ask, which is also given the configuration to stop the search if
+    the question is not answered. """
+    valid = list(map(lambda ex: [ex] if isinstance(ex, str) else ex, payload['valid']))
+    invalid = list(map(lambda ex: [ex], payload.get('invalid', [])))
+    condition_invalid = list(map(lambda ex: [ex], payload.get('condition_invalid', [])))
+    ground_truth = payload.get('ground_truth', '')
+    configuration = _make_configuration(payload.get('configuration', {}))
+    configuration.ask = lambda question: ask(question, configuration)
+
+    program = synthesize_examples(valid, invalid, condition_invalid, ground_truth,
+                                  configuration)
+
+    result = {'solution': None, 'captures': None, 'stats': stats.to_dict()}
+    if program is not None:
+        printer = RegexInterpreter()
+        regex, capturing_groups, capture_conditions = program
+        conditions, condition_captures = capture_conditions
+        result['solution'] = printer.eval(regex, captures=condition_captures)
+        if len(conditions) > 0:
+            result['solution'] += ', ' + conditions_to_str(conditions)
+        if len(capturing_groups) > 0:
+            result['captures'] = printer.eval(regex, captures=capturing_groups)
+    return result
+
+
+def _serve_requests(tasks, events, answers, answer_timeout):
+    """ Entry point of the worker processes. Reports the progress of each request as
+    (request_id, status, data) events. A question not answered within answer_timeout
+    seconds stops the synthesis, which returns the best regex found so far. """
+    signal(SIGINT, SIG_IGN)  # the server stops the workers
+    signal(SIGTERM, SIG_IGN)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        request_id, payload = task
+        while True:  # drop the answers that came too late for the previous request
+            try:
+                answers.get_nowait()
+            except queue.Empty:
+                break
+        events.put((request_id, 'running', {'worker': os.getpid()}))
+
+        def ask(question, configuration):
+            events.put((request_id, 'question', {'question': question.strip()}))
+            try:
+                return answers.get(timeout=answer_timeout)
+            except queue.Empty:
+                logger.warning(f'Request {request_id}: no answer after {answer_timeout} '
+                               f'seconds, stopping.')
+                configuration.die = True
+                events.put((request_id, 'running', {}))
+                return ''
+
+        stats.reset()
+        try:
+            events.put((request_id, 'done', _synthesize_request(payload, ask)))
+        except Exception as e:
+            logger.error(f'Request {request_id} failed: {e!r}')
+            events.put((request_id, 'failed', {'error': repr(e)}))
+
+
+class SynthesisServer:
+    """ Queues synthesis requests and runs them on a pool of worker processes. """
+
+    def __init__(self, workers: int = 1, answer_timeout: float = 300):
+        self._tasks = multiprocessing.Queue()
+        self._events = multiprocessing.Queue()
+        self._answers = {}
+        self._workers = {}
+        for _ in range(workers):
+            answers = multiprocessing.Queue()
+            worker = multiprocessing.Process(target=_serve_requests,
+                                             args=(self._tasks, self._events, answers,
+                                                   answer_timeout))
+            worker.start()
+            self._workers[worker.pid] = worker
+            self._answers[worker.pid] = answers
+
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._event_thread = threading.Thread(target=self._handle_events, daemon=True)
+        self._event_thread.start()
+
+    def submit(self, payload: dict) -> str:
+        if not isinstance(payload.get('valid'), list) or len(payload['valid']) == 0:
+            raise ValueError('Requests must have a non-empty list of valid examples')
+        _make_configuration(payload.get('configuration', {}))
+        request_id = uuid.uuid4().hex
+        with self._lock:
+            self.requests[request_id] = {'id': request_id, 'status': 'queued'}
+        self._tasks.put((request_id, payload))
+        return request_id
+
+    def status(self, request_id: str):
+        with self._lock:
+            request = self.requests.get(request_id)
+            return None if request is None else dict(request)
+
+    def answer(self, request_id: str, answer: str) -> bool:
+        """ Answer the pending question of a request. Returns False if it has none. """
+        with self._lock:
+            request = self.requests.get(request_id)
+            if request is None or request['status'] != 'question':
+                return False
+            request['status'] = 'running'
+            request.pop('question')
+            self._answers[request['worker']].put(answer)
+        return True
+
+    def _handle_events(self):
+        while True:
+            event = self._events.get()
+            if event is None:
+                break
+            request_id, status, data = event
+            with self._lock:
+                request = self.requests[request_id]
+                request['status'] = status
+                if status != 'question':
+                    request.pop('question', None)
+                request.update(data)
+
+    def shutdown(self):
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers.values():
+            worker.join(1)
+            if worker.is_alive():  # still synthesizing
+                worker.kill()
+                worker.join()
+        self._events.put(None)
+        self._event_thread.join()
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'FOREST'
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'requests':
+            request = self.server.synthesis.status(parts[1])
+            if request is not None:
+                return self._reply(200, request)
+        self._reply(404, {'error': 'Unknown request'})
+
+    def do_POST(self):
+        parts = self.path.strip('/').split('/')
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            payload = json.loads(body or '{}')
+            if parts == ['requests']:
+                return self._reply(202, {'id': self.server.synthesis.submit(payload)})
+            elif len(parts) == 3 and parts[0] == 'requests' and parts[2] == 'answer':
+                if self.server.synthesis.answer(parts[1], str(payload.get('answer', ''))):
+                    return self._reply(200, {'id': parts[1]})
+                return self._reply(409, {'error': 'No pending question'})
+        except (ValueError, TypeError) as e:
+            return self._reply(400, {'error': str(e)})
+        self._reply(404, {'error': 'Unknown path'})
+
+    def _reply(self, code, data):
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        logger.debug(f'{self.address_string()} {format % args}')
+
+
+class _UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        self.socket.bind(self.server_address)
+        self.server_name, self.server_port = 'localhost', 0
+
+
+def _interrupt(received_signal, frame):
+    raise KeyboardInterrupt
+
+
+def serve(workers: int = 1, port: int = 8000, socket_path: str = '',
+          answer_timeout: float = 300):
+    """ Run the server until interrupted. Listens on a Unix socket if socket_path is set,
+    and on localhost:port otherwise. """
+    if len(socket_path) > 0:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        httpd = _UnixHTTPServer(socket_path, _RequestHandler)
+    else:
+        httpd = ThreadingHTTPServer(('localhost', port), _RequestHandler)
+    httpd.synthesis = SynthesisServer(workers, answer_timeout)
+    signal(SIGTERM, _interrupt)
+    logger.info(f'Serving on {socket_path or f"localhost:{port}"} with {workers} workers.')
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.synthesis.shutdown()
+        if len(socket_path) > 0:
+            os.remove(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Validations Synthesizer server',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Worker processes running synthesis requests.')
+    parser.add_argument('-p', '--port', type=int, default=8000, help='Port on localhost.')
+    parser.add_argument('-u', '--socket', metavar='PATH', type=str, default='',
+                        help='Listen on a Unix socket instead of a port.')
+    parser.add_argument('-t', '--answer-timeout', metavar='SECONDS', type=float, default=300,
+                        help='Time to answer a question before the request returns the '
+                             'best regex found so far.')
+    parser.add_argument('-v', '--verbose', action='count', default=0)
+    args = parser.parse_args()
+    if args.verbose > 1:
+        logger.setLevel("DEBUG")
+    elif args.verbose > 0:
+        logger.setLevel("INFO")
+    serve(args.workers, args.port, args.socket, args.answer_timeout)
+
+
+if __name__ == '__main__':
+    main()
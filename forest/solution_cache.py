@@ -0,0 +1,213 @@
+import hashlib
+import json
+import pickle
+import re
+import sqlite3
+import time
+from typing import List, Tuple
+
+from forest.configuration import Configuration
+from forest.logger import get_logger
+from forest.parse_examples import split_captures
+from forest.utils import check_conditions, conditions_to_str
+from forest.visitor import RegexInterpreter
+
+logger = get_logger('forest')
+
+# Configuration fields that can change the synthesized solution.
+_key_fields = ('encoding', 'self_interact', 'pruning', 'equivalence_pruning', 'synth_captures',
+               'synth_conditions', 'disambiguation', 'sketching', 'force_dynamic', 'incremental',
+               'processes', 'cegis_examples', 'deduplicate')
+
+
+def configuration_key(configuration: Configuration) -> dict:
+    """ The configuration fields that can change the solution, with the values that the
+    synthesizers run with: the portfolio and the parallel multitree search cannot interact
+    with the user, so they turn disambiguation off unless self_interact. """
+    fields = {field: getattr(configuration, field) for field in _key_fields}
+    in_workers = configuration.sketching == 'none' and \
+        (configuration.encoding == 'portfolio' or
+         configuration.processes > 1 and configuration.encoding in ('multitree', 'dynamic'))
+    if in_workers and not configuration.self_interact:
+        fields['disambiguation'] = False
+    return fields
+
+
+def solution_key(valid: List[List[str]], invalid: List[List[str]],
+                 condition_invalid: List[List[str]], captures: List[List[str]],
+                 configuration: Configuration) -> str:
+    """ Canonical hash of the example sets and of the configuration fields that can change
+    the solution. The order of the examples does not matter. """
+    content = {
+        'valid': sorted(map(lambda ex, cap: json.dumps([ex, cap]), valid, captures)),
+        'invalid': sorted(map(json.dumps, invalid)),
+        'condition_invalid': sorted(map(json.dumps, condition_invalid)),
+        'configuration': configuration_key(configuration),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def warm_start_key(configuration: Configuration, dsl) -> str:
+    """ Hash of the configuration fields that can change the solution and of the DSL built
+    for the examples. A previous solution is only resumed from if both are the same, since
+    its trees are decoded with the productions of the DSL. """
+    content = {
+        'configuration': configuration_key(configuration),
+        'dsl': sorted(map(str, dsl.productions())),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+
+def example_sets(valid: List[List[str]], invalid: List[List[str]],
+                 condition_invalid: List[List[str]], captures: List[List[str]]) -> dict:
+    """ The example strings of each kind, sorted, to be stored along with a solution. """
+    return {'valid': sorted(map(lambda ex: ex[0], valid)),
+            'invalid': sorted(map(lambda ex: ex[0], invalid)),
+            'condition_invalid': sorted(map(lambda ex: ex[0], condition_invalid))}
+
+
+def examples_contained(old: dict, new: dict) -> bool:
+    """ Whether every example of the old example sets is in the new ones. """
+    return all(map(lambda kind: set(old[kind]) <= set(new[kind]),
+                   ('valid', 'invalid', 'condition_invalid')))
+
+
+def failed_examples(program, valid, invalid, condition_invalid, captures) \
+        -> Tuple[List[int], List[int], List[int]]:
+    """ Indices of the valid examples that the solution rejects, or whose captures or
+    capture conditions it gets wrong, of the invalid examples that it accepts, and of the
+    condition-invalid examples that its capture conditions accept. """
+    printer = RegexInterpreter()
+    regex, capturing_groups, capture_conditions = program
+    conditions, condition_captures = capture_conditions
+
+    compiled_re = re.compile(printer.eval(regex))
+    failed_valid = set(filter(lambda i: compiled_re.fullmatch(valid[i][0]) is None,
+                              range(len(valid))))
+    failed_invalid = list(filter(lambda i: compiled_re.fullmatch(invalid[i][0]) is not None,
+                                 range(len(invalid))))
+    failed_condition_invalid = []
+
+    if len(capturing_groups) > 0:
+        compiled_re = re.compile(printer.eval(regex, captures=capturing_groups))
+        for i, (ex, expected) in enumerate(zip(valid, captures)):
+            match = compiled_re.fullmatch(ex[0])
+            if match is not None and any(map(lambda g, e: g != e, match.groups(), expected)):
+                failed_valid.add(i)
+
+    if len(conditions) > 0:
+        condition_strs = list(map(lambda c: f'${c[0]} {c[1]} {c[2]}', conditions))
+        compiled_re = re.compile(printer.eval(regex, captures=condition_captures))
+        for i, ex in enumerate(valid):
+            match = compiled_re.fullmatch(ex[0])
+            if match is not None and not check_conditions(condition_strs, match):
+                failed_valid.add(i)
+        for i, ex in enumerate(condition_invalid):
+            match = compiled_re.fullmatch(ex[0])
+            if match is not None and check_conditions(condition_strs, match):
+                failed_condition_invalid.append(i)
+    return sorted(failed_valid), failed_invalid, failed_condition_invalid
+
+
+def verify_solution(program, valid, invalid, condition_invalid, captures) -> bool:
+    """ Check that the solution accepts all valid examples with the expected captures,
+    rejects all invalid examples, and rejects the condition-invalid examples through its
+    capture conditions. """
+    return not any(failed_examples(program, valid, invalid, condition_invalid, captures))
+
+
+def wrong_examples(program, valid, invalid, condition_invalid) -> Tuple[List, List]:
+    """ The valid examples, with their captures, and the invalid examples, as read from
+    the instance, that the solution gets wrong. """
+    failed_valid, failed_invalid, _ = \
+        failed_examples(program, *split_captures(valid, invalid, condition_invalid))
+    return list(map(lambda i: valid[i], failed_valid)), \
+           list(map(lambda i: invalid[i], failed_invalid))
+
+
+class SolutionCache:
+    """ Persistent cache of synthesized solutions, stored in a SQLite file and keyed by
+    solution_key. """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS solutions '
+                '(key TEXT PRIMARY KEY, solution TEXT, program BLOB, created REAL)')
+            # key of the last solution stored for each instance, the example sets it was
+            # synthesized from and its warm_start_key, used to warm start
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS instances '
+                '(name TEXT PRIMARY KEY, key TEXT, examples TEXT, context TEXT)')
+            columns = list(map(lambda row: row[1],
+                               self._connection.execute('PRAGMA table_info(instances)')))
+            # caches created before these were stored
+            if 'examples' not in columns:
+                self._connection.execute('ALTER TABLE instances ADD COLUMN examples TEXT')
+            if 'context' not in columns:
+                self._connection.execute('ALTER TABLE instances ADD COLUMN context TEXT')
+
+    def get(self, key: str, valid, invalid, condition_invalid, captures):
+        """ Returns the cached solution, if any and if it still satisfies the examples. """
+        row = self._connection.execute('SELECT solution, program FROM solutions WHERE key = ?',
+                                       (key,)).fetchone()
+        if row is None:
+            return None
+        solution_str, blob = row
+        try:
+            program = pickle.loads(blob)
+            verified = verify_solution(program, valid, invalid, condition_invalid, captures)
+        except Exception:  # the pickled program no longer matches the code
+            verified = False
+        if not verified:
+            logger.warning(f'Discarding cached solution {solution_str}.')
+            self.remove(key)
+            return None
+        logger.info(f'Found cached solution {solution_str}.')
+        return program
+
+    def get_latest(self, instance: str, context: str):
+        """ Returns the last solution stored for the instance, whatever its examples were,
+        without checking it, and the example sets it was synthesized from, or None if they
+        were not stored. Returns None if the solution was synthesized with another
+        warm_start_key, given as context. """
+        row = self._connection.execute(
+            'SELECT solutions.program, instances.examples, instances.context FROM instances '
+            'JOIN solutions ON instances.key = solutions.key WHERE instances.name = ?',
+            (instance,)).fetchone()
+        if row is None:
+            return None
+        if row[2] != context:
+            logger.info(f'The last solution of {instance} was synthesized with another '
+                        f'configuration or DSL. Not resuming from it.')
+            return None
+        try:
+            program = pickle.loads(row[0])
+        except Exception:  # the pickled program no longer matches the code
+            return None
+        return program, json.loads(row[1]) if row[1] is not None else None
+
+    def put(self, key: str, program, instance: str = '', examples: dict = None,
+            context: str = None):
+        regex, _, capture_conditions = program
+        conditions, condition_captures = capture_conditions
+        solution_str = RegexInterpreter().eval(regex, captures=condition_captures)
+        if len(conditions) > 0:
+            solution_str += ', ' + conditions_to_str(conditions)
+        with self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)',
+                                     (key, solution_str, pickle.dumps(program), time.time()))
+            if len(instance) > 0:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO instances VALUES (?, ?, ?, ?)',
+                    (instance, key, json.dumps(examples) if examples is not None else None,
+                     context))
+
+    def remove(self, key: str):
+        with self._connection:
+            self._connection.execute('DELETE FROM solutions WHERE key = ?', (key,))
+
+    def close(self):
+        self._connection.close()
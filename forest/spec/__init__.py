@@ -1,8 +1,22 @@
+import importlib
+
 from . import expr
-from .desugar import ParseTreeProcessingError
-from .do_parse import parse, parse_file
-from .parser import LarkError as ParseError
 from .predicate import Predicate
 from .production import Production, EnumProduction, ParamProduction, FunctionProduction
 from .spec import TypeSpec, ProductionSpec, ProgramSpec, TyrellSpec
 from .type import Type, EnumType, ValueType
+
+# The standalone parser is a large module: it is only imported when a spec is parsed.
+_lazy_names = {
+    'parse': ('.do_parse', 'parse'),
+    'parse_file': ('.do_parse', 'parse_file'),
+    'ParseError': ('.parser', 'LarkError'),
+    'ParseTreeProcessingError': ('.desugar', 'ParseTreeProcessingError'),
+}
+
+
+def __getattr__(name):
+    if name in _lazy_names:
+        module, attr = _lazy_names[name]
+        return getattr(importlib.import_module(module, __name__), attr)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
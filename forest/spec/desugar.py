@@ -49,7 +49,7 @@ class TypeCollector(Visitor_Recursive):
         return ret
 
     def value_decl(self, tree):
-        name = tree.children[0]
+        name = str(tree.children[0])
         properties = self._process_properties(tree.children[1].children)
         try:
             self._spec.define_type(ValueType(name, properties))
@@ -267,7 +267,7 @@ class PredicateCollector(Visitor_Recursive):
             raise NotImplementedError(msg)
 
     def pred_body(self, tree):
-        name = tree.children[0]
+        name = str(tree.children[0])
         args = [self._process_arg(x) for x in tree.children[1].children]
         self._pred_spec.add_predicate(name, args)
 
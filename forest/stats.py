@@ -1,3 +1,8 @@
+def stats_path(log_path: str) -> str:
+    """ Path of the JSON record of the statistics of the run logged to log_path. """
+    return log_path + '.json'
+
+
 class Statistics:
     """ Singleton class to store synthesizer's statistics. """
     __instance__ = None
@@ -22,6 +27,23 @@ class Statistics:
             self.enumerated_cap_groups = 0
             self.enumerated_cap_conditions = 0
 
+            # regex cache of the decider
+            self.regex_cache_hits = 0
+            self.regex_cache_misses = 0
+
+            # examples matched by the decider
+            self.example_matches = 0
+
+            # subtrees blocked for being observationally equivalent to smaller ones
+            self.equivalent_subtrees = 0
+
+            # predicates forwarded between the worker processes of the static multitree
+            # encoding
+            self.shared_predicates = 0
+
+            # examples added by counterexample-guided synthesis
+            self.counterexamples = 0
+
             # interactions
             self.regex_interactions = 0
             self.cap_conditions_interactions = 0
@@ -37,6 +59,17 @@ class Statistics:
             Statistics()
         return Statistics.__instance__
 
+    def reset(self):
+        """ Reset all statistics, to synthesize again in the same process. """
+        Statistics.__instance__ = None
+        Statistics.__init__(self)
+
+    def to_dict(self):
+        """ Statistics as a dictionary that can be serialized to JSON. """
+        ret = dict(vars(self))
+        ret['per_depth_times'] = {str(k): v for k, v in self.per_depth_times.items()}
+        return ret
+
     def __str__(self):
         return \
             f'Elapsed time: {self.total_synthesis_time}\n' \
@@ -47,6 +80,11 @@ class Statistics:
             f'  Enumerated: {self.enumerated_regexes}\n' \
             f'  Interactions: {self.regex_interactions}\n' \
             f'  Distinguish time: {round(self.regex_distinguishing_time, 2)}\n' \
+            f'  Cache hits/misses: {self.regex_cache_hits}/{self.regex_cache_misses}\n' \
+            f'  Example matches: {self.example_matches}\n' \
+            f'  Equivalent subtrees: {self.equivalent_subtrees}\n' \
+            f'  Shared predicates: {self.shared_predicates}\n' \
+            f'  Counterexamples: {self.counterexamples}\n' \
             f'Capturing groups synthesis:\n' \
             f'  Cap. groups time: {round(self.cap_groups_synthesis_time, 2)}\n' \
             f'  Enumerated: {self.enumerated_cap_groups}\n' \
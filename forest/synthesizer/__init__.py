@@ -1,5 +1,22 @@
-from .ktree_synthesizer import KTreeSynthesizer
-from .lines_synthesizer import LinesSynthesizer
-from .multiple_synthesizer import MultipleSynthesizer
-from .multitree_synthesizer import MultiTreeSynthesizer
-from .sketch_synthesizer import SketchSynthesizer
+import importlib
+
+# Synthesizers are imported on first access, so that only the modules of the chosen
+# encoding are loaded.
+_lazy_names = {
+    'BottomUpSynthesizer': '.bottom_up_synthesizer',
+    'build_synthesizer': '.cegis',
+    'KTreeSynthesizer': '.ktree_synthesizer',
+    'LinesSynthesizer': '.lines_synthesizer',
+    'MultipleSynthesizer': '.multiple_synthesizer',
+    'MultiTreeSynthesizer': '.multitree_synthesizer',
+    'PortfolioSynthesizer': '.portfolio_synthesizer',
+    'make_synthesizer': '.portfolio_synthesizer',
+    'SketchSynthesizer': '.sketch_synthesizer',
+    'synthesize_examples': '.cegis',
+}
+
+
+def __getattr__(name):
+    if name in _lazy_names:
+        return getattr(importlib.import_module(_lazy_names[name], __name__), name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
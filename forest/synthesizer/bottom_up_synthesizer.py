@@ -0,0 +1,35 @@
+import time
+
+from forest.configuration import Configuration
+from forest.enumerator import BottomUpEnumerator
+from forest.logger import get_logger
+from forest.stats import Statistics
+from .multiple_synthesizer import MultipleSynthesizer
+
+logger = get_logger('forest')
+stats = Statistics.get_statistics()
+
+
+class BottomUpSynthesizer(MultipleSynthesizer):
+    def __init__(self, valid_examples, invalid_examples, captured, condition_invalid, dsl,
+                 ground_truth, configuration: Configuration):
+        super().__init__(valid_examples, invalid_examples, captured, condition_invalid,
+                         dsl, ground_truth, configuration)
+        self.max_size = 20
+
+    def synthesize(self):
+        self.start_time = time.time()
+        self._enumerator = BottomUpEnumerator(self.dsl, self._decider.signature)
+
+        for size in range(1, self.max_size + 1):
+            size_start = time.time()
+            self.try_for_depth()
+            stats.per_depth_times[size] = time.time() - size_start
+
+            if len(self.solutions) > 0:
+                self.terminate()
+                return self.solutions[0]
+            elif self.stopped:
+                self.terminate()
+                return
+            self._enumerator.grow()
@@ -0,0 +1,90 @@
+from typing import Callable, List, Optional
+
+from forest.configuration import Configuration
+from forest.logger import get_logger
+from forest.parse_examples import preprocess, deduplicate
+from forest.solution_cache import wrong_examples
+from forest.utils import representatives
+
+logger = get_logger('forest')
+
+
+def build_synthesizer(valid, invalid, condition_invalid, ground_truth,
+                      configuration: Configuration):
+    """ Preprocess the examples and build the synthesizer for the configuration. """
+    from .portfolio_synthesizer import PortfolioSynthesizer, make_synthesizer
+    dsl, valid, invalid, condition_invalid, captures, type_validation = \
+        preprocess(valid, invalid, condition_invalid)
+    if configuration.sketching != 'none':
+        from .sketch_synthesizer import SketchSynthesizer
+        dsl, valid, invalid, condition_invalid, captures, type_validation = \
+            preprocess(valid, invalid, condition_invalid, sketch=True)
+        if "string" not in type_validation[0] and "regex" not in type_validation[0]:
+            raise Exception("MultiTree Synthesizer is only for strings.")
+        return SketchSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                 ground_truth, configuration=configuration)
+    elif configuration.encoding == 'portfolio':
+        return PortfolioSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                    ground_truth, configuration=configuration)
+    else:
+        if configuration.encoding == 'multitree' and \
+                "string" not in type_validation[0] and "regex" not in type_validation[0]:
+            raise Exception("MultiTree Synthesizer is only for strings.")
+        return make_synthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                ground_truth, configuration=configuration)
+
+
+def synthesize_examples(valid: List[List], invalid: List[List], condition_invalid: List[List],
+                        ground_truth: str, configuration: Configuration, warm_start=None,
+                        on_synthesizer: Optional[Callable] = None):
+    """
+    Synthesize a regex for the examples, as read from an instance: valid examples are
+    followed by their captures. With configuration.cegis_examples or deduplicate, the
+    search starts from a subset of the examples, and is started over with the examples
+    that its solution gets wrong until it satisfies all of them. warm_start holds the
+    arguments of the synthesizer's warm_start. on_synthesizer is called with each
+    synthesizer built, before it starts.
+    """
+    corpus = None
+    if configuration.cegis_examples > 0 or configuration.deduplicate:
+        corpus = valid, invalid
+    if configuration.cegis_examples > 0:
+        valid = representatives(valid, configuration.cegis_examples)
+        invalid = representatives(invalid, configuration.cegis_examples)
+    if configuration.deduplicate:
+        valid, invalid = deduplicate(valid, invalid)
+    if corpus is not None:
+        logger.info(f'Synthesizing from {len(valid)} valid and {len(invalid)} invalid '
+                    f'examples, then checking against all of them.')
+
+    while True:
+        synthesizer = build_synthesizer(valid, invalid, condition_invalid, ground_truth,
+                                        configuration)
+        if warm_start is not None:
+            synthesizer.warm_start(*warm_start)
+        if corpus is not None:
+            synthesizer.use_corpus(*corpus)
+        if on_synthesizer is not None:
+            on_synthesizer(synthesizer)
+        program = synthesizer.synthesize()
+        if corpus is None or configuration.die:
+            return program
+        if program is not None:
+            # Only the regex was checked against all the examples: its captures and
+            # capture conditions were synthesized from the subset.
+            new_valid, new_invalid = wrong_examples(program, *corpus, condition_invalid)
+            if len(new_valid) + len(new_invalid) == 0:
+                return program
+        else:
+            # The valid counterexamples may need a DSL or a split of the examples that
+            # cannot be built from the examples synthesis started from.
+            new_valid, new_invalid = synthesizer.counterexamples
+            if len(new_valid) == 0:
+                return program
+            by_input = dict(map(lambda ex: (ex[0], ex), corpus[0]))
+            new_valid = list(map(lambda ex: by_input[ex], new_valid))
+            new_invalid = list(map(lambda ex: [ex], new_invalid))
+        logger.info(f'Restarting with {len(new_valid)} more valid and {len(new_invalid)} '
+                    f'more invalid examples.')
+        valid = valid + new_valid
+        invalid = invalid + new_invalid
@@ -30,6 +30,6 @@ class KTreeSynthesizer(MultipleSynthesizer):
             if len(self.solutions) > 0:
                 self.terminate()
                 return self.solutions[0]
-            elif self.configuration.die:
+            elif self.stopped:
                 self.terminate()
                 return
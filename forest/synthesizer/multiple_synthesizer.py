@@ -1,4 +1,6 @@
 import datetime
+import json
+import logging
 import re
 import socket
 import time
@@ -9,12 +11,14 @@ from termcolor import colored
 
 from forest.capturer import Capturer
 from forest.configuration import Configuration
-from forest.decider import RegexDecider
+from forest.decider import RegexDecider, CorpusChecker
 from forest.distinguisher import RegexDistinguisher
-from forest.logger import get_logger
+from forest.logger import get_logger, lazy
+from forest.profiler import profiler
 from forest.spec import TyrellSpec
-from forest.stats import Statistics
-from forest.utils import nice_time, is_regex, yes_values, no_values, conditions_to_str
+from forest.stats import Statistics, stats_path
+from forest.utils import nice_time, is_regex, yes_values, no_values, conditions_to_str, \
+    representatives, shape
 from forest.visitor import RegexInterpreter, NodeCounter
 
 logger = get_logger('forest')
@@ -48,6 +52,8 @@ class MultipleSynthesizer(ABC):
 
         if not configuration.pruning:
             logger.warning('Synthesizing without pruning the search space.')
+        if len(configuration.profile_path) > 0:
+            profiler.enabled = True
         # If auto-interaction is enabled, the ground truth must be a valid regex.
         if self.configuration.self_interact:
             assert len(self.ground_truth_regex) > 0 and is_regex(self.ground_truth_regex)
@@ -55,9 +61,14 @@ class MultipleSynthesizer(ABC):
         # Initialize components
         self._printer = RegexInterpreter()  # Works like to_string
         self._distinguisher = RegexDistinguisher()
-        self._decider = RegexDecider(interpreter=RegexInterpreter(),
-                                     valid_examples=self.valid + self.condition_invalid,
-                                     invalid_examples=self.invalid)
+        # All the examples, when synthesizing from a subset of them, and the valid and
+        # invalid ones that were added to the subset.
+        self._corpus = None
+        self.counterexamples = ([], [])
+        self._decider = None
+        self._set_decider(RegexDecider(interpreter=RegexInterpreter(),
+                                       valid_examples=self.valid + self.condition_invalid,
+                                       invalid_examples=self.invalid))
 
         # Capturer works like a synthesizer of capturing groups
         self._capturer = Capturer(self.valid, self.captured, self.condition_invalid,
@@ -71,6 +82,10 @@ class MultipleSynthesizer(ABC):
         # To store synthesized regexes and captures:
         self.solutions = []
         self.first_regex = None
+        # Regex of a previous solution from which the search is resumed, if any, and
+        # whether no regex smaller than it can satisfy the examples.
+        self.warm_start_regex = None
+        self.warm_start_skips_smaller = False
 
         # counters and timers:
         self.indistinguishable = 0
@@ -87,6 +102,42 @@ class MultipleSynthesizer(ABC):
     def decider(self):
         return self._decider
 
+    @property
+    def stopped(self):
+        """ Whether the search must stop, because the user interrupted it or because it
+        must start over with new valid examples. """
+        return self.configuration.die or len(self.counterexamples[0]) > 0
+
+    def _set_decider(self, decider: RegexDecider):
+        """ Replace the decider, sharding its examples across worker processes if the
+        instance is large enough. The pool of workers of the previous decider is kept if it
+        holds the same examples. """
+        checker = None
+        if self._decider is not None:
+            checker = self._decider.detach_checker()
+            self._decider.close()
+        self._decider = decider
+        if self.configuration.check_processes > 1 and \
+                len(decider.examples) >= self.configuration.min_sharded_examples:
+            decider.use_sharded_checker(self.configuration.check_processes, checker)
+        elif checker is not None:
+            checker.close()
+
+    def use_corpus(self, valid_examples, invalid_examples):
+        """ Synthesize counterexample-guided: the given examples are a superset of the
+        ones the synthesizer was built with, and every regex that satisfies the latter is
+        checked against them. """
+        self._corpus = CorpusChecker(list(map(lambda ex: ex[0], valid_examples)),
+                                     list(map(lambda ex: ex[0], invalid_examples)))
+
+    def warm_start(self, program, skip_smaller=False):
+        """ Resume the search from a previous solution, that no longer satisfies the
+        examples. Only the multitree synthesizer uses it. If skip_smaller, the previous
+        examples are all among the current ones, so the sizes below the previous solution
+        are not searched again. """
+        self.warm_start_regex = program[0]
+        self.warm_start_skips_smaller = skip_smaller
+
     @abstractmethod
     def synthesize(self):
         """ Main synthesis procedure. Implemented in subclasses. """
@@ -94,29 +145,43 @@ class MultipleSynthesizer(ABC):
 
     def terminate(self):
         stats.total_synthesis_time = round(time.time() - self.start_time, 2)
+        self._decider.close()
         logger.info(f'Synthesizer done.')
 
         now = datetime.datetime.now()
-        info_str = f'On {socket.gethostname()} on {now.strftime("%Y-%m-%d %H:%M:%S")}.\n'
+        # Same information as the text log, read by scripts/make_table.py.
+        record = {'host': socket.gethostname(), 'date': now.strftime("%Y-%m-%d %H:%M:%S"),
+                  'enumerator': str(self._enumerator), 'pruning': self.configuration.pruning,
+                  'timed_out': self.configuration.die, **stats.to_dict(),
+                  'first_regex': None, 'solution': None, 'nodes': None, 'cap_groups': None,
+                  'num_cap_groups': 0, 'ground_truth': None}
+        info_str = f'On {record["host"]} on {record["date"]}.\n'
         info_str += f'Enumerator: {self._enumerator}' \
                     f'{" (no pruning)" if not self.configuration.pruning else ""}\n'
         info_str += f'Terminated: {self.configuration.die}\n'
         info_str += str(stats) + "\n\n"
+        if profiler.enabled:
+            info_str += str(profiler) + "\n"
 
         if len(self.solutions) > 0:
             if self.configuration.print_first_regex:
                 first_regex_str = self._decider.interpreter.eval(self.first_regex)
                 info_str += f'First regex: {first_regex_str}\n'
+                record['first_regex'] = first_regex_str
             regex, capturing_groups, capture_conditions = self.solutions[0]
             conditions, conditions_captures = capture_conditions
             solution_str = self._decider.interpreter.eval(regex, captures=conditions_captures)
             if len(conditions) > 0:
                 solution_str += ', ' + conditions_to_str(conditions)
+            record['solution'] = solution_str
+            record['nodes'] = self._node_counter.eval(self.solutions[0][0])
             info_str += f'Solution: {solution_str}\n' \
-                        f'  Nodes: {self._node_counter.eval(self.solutions[0][0])}\n'
+                        f'  Nodes: {record["nodes"]}\n'
             if len(capturing_groups) > 0:
-                info_str += f'  Cap. groups: ' \
-                            f'{self._decider.interpreter.eval(regex, captures=capturing_groups)}\n' \
+                record['cap_groups'] = \
+                    self._decider.interpreter.eval(regex, captures=capturing_groups)
+                record['num_cap_groups'] = len(capturing_groups)
+                info_str += f'  Cap. groups: {record["cap_groups"]}\n' \
                             f'  Num. cap. groups: {len(capturing_groups)}'
             else:
                 info_str += "  No capturing groups."
@@ -126,13 +191,18 @@ class MultipleSynthesizer(ABC):
         info_str += '\n'
 
         if self.ground_truth_regex is not None:
-            info_str += f'  Ground truth: {self.ground_truth_regex}' \
-                        f' {", ".join(self.ground_truth_conditions)}'
+            record['ground_truth'] = f'{self.ground_truth_regex}' \
+                                     f' {", ".join(self.ground_truth_conditions)}'
+            info_str += f'  Ground truth: {record["ground_truth"]}'
         logger.info(info_str)
 
         if len(self.configuration.log_path) > 0:
-            f = open(self.configuration.log_path, "w")
-            f.write(info_str)
+            with open(self.configuration.log_path, "w") as f:
+                f.write(info_str)
+            with open(stats_path(self.configuration.log_path), "w") as f:
+                json.dump(record, f, indent=2)
+        if len(self.configuration.profile_path) > 0:
+            profiler.dump_folded(self.configuration.profile_path)
 
     def distinguish(self):
         """ Generate a distinguishing input between programs (if there is one),
@@ -168,16 +238,30 @@ class MultipleSynthesizer(ABC):
         stats.regex_distinguishing_time += time.time() - distinguish_start
         stats.regex_synthesis_time += time.time() - distinguish_start
 
+    def add_example(self, example: str, valid: bool):
+        """ Add an example to the decider. The subtrees blocked as equivalent to smaller ones
+        may tell it apart, so they are unblocked. """
+        self._decider.add_example([example], valid)
+        if self._enumerator is not None:
+            self._enumerator.forget_equivalences()
+
+    def _share_predicates(self, predicates):
+        """ Called with the predicates learned from each rejected regex, for synthesizers
+        that search in several processes to share them. """
+        pass
+
     def enumerate(self):
         """ Request new program from the enumerator. """
         stats.enumerated_regexes += 1
-        program = self._enumerator.next()
+        with profiler.phase('next'):
+            program = self._enumerator.next()
         if program is None:  # enumerator is exhausted
             return
-        if self._printer is not None:
-            logger.debug(f'Enumerator generated: {self._printer.eval(program)}')
-        else:
-            logger.debug(f'Enumerator generated: {program}')
+        with profiler.phase('log'):
+            if self._printer is not None:
+                logger.debug('Enumerator generated: %s', lazy(self._printer.eval, program))
+            else:
+                logger.debug('Enumerator generated: %s', program)
 
         if stats.enumerated_regexes > 0 and time.time() - self.last_print_time > 30:
             logger.info(
@@ -192,17 +276,17 @@ class MultipleSynthesizer(ABC):
         valid_answer = False
         # Do not count time spent waiting for user input: add waiting time to start_time.
         while not valid_answer and not self.configuration.die:
-            x = input(f'Is "{dist_input}" valid? (y/n)\n')
+            x = self.configuration.ask(f'Is "{dist_input}" valid? (y/n)\n')
             if x.lower().rstrip() in yes_values:
                 logger.info(f'"{dist_input}" is {colored("valid", "green")}.')
                 valid_answer = True
-                self._decider.add_example([dist_input], True)
+                self.add_example(dist_input, True)
                 self.solutions = keep_if_valid
                 # self.indistinguishable = 0
             elif x.lower().rstrip() in no_values:
                 logger.info(f'"{dist_input}" is {colored("invalid", "red")}.')
                 valid_answer = True
-                self._decider.add_example([dist_input], False)
+                self.add_example(dist_input, False)
                 self.solutions = keep_if_invalid
                 # self.indistinguishable = 0
             else:
@@ -213,11 +297,11 @@ class MultipleSynthesizer(ABC):
         match = re.fullmatch(self.ground_truth_regex, dist_input)
         if match is not None:
             logger.info(f'Auto: "{dist_input}" is {colored("valid", "green")}.')
-            self._decider.add_example([dist_input], True)
+            self.add_example(dist_input, True)
             self.solutions = keep_if_valid
         else:
             logger.info(f'Auto: "{dist_input}" is {colored("invalid", "red")}.')
-            self._decider.add_example([dist_input], False)
+            self.add_example(dist_input, False)
             self.solutions = keep_if_invalid
 
     def try_for_depth(self):
@@ -225,12 +309,17 @@ class MultipleSynthesizer(ABC):
         while True:
             regex = self.try_regex()
 
-            if regex is None or self.configuration.die:  # enumerator is exhausted or user interrupted synthesizer
+            if regex is None or self.stopped:  # enumerator is exhausted or user interrupted synthesizer
                 break
 
             if regex == -1:  # enumerated a regex that is not correct
                 continue
 
+            if self._corpus is not None and self.add_counterexamples(regex):
+                if self.stopped:
+                    break
+                continue
+
             if self.configuration.synth_captures:
                 capturing_groups = self.try_capturing_groups(regex)
 
@@ -264,6 +353,32 @@ class MultipleSynthesizer(ABC):
             self.distinguish()
         assert len(self.solutions) <= 1  # only one regex remains
 
+    def add_counterexamples(self, regex):
+        """ Check a regex against all the examples. The invalid examples it matches are
+        added to the decider, one of each shape. The valid examples it does not match can
+        change the DSL and how the examples are split, so they stop the search, to start
+        over with them. Returns True if there were any counterexamples. """
+        check_start = time.time()
+        regex_str = self._decider.interpreter.eval(regex)
+        missed_valid, matched_invalid = self._corpus.counterexamples(regex_str)
+        new_valid = self._one_per_shape(missed_valid)
+        new_invalid = self._one_per_shape(matched_invalid)
+        for ex in new_invalid:
+            self.add_example(ex, False)
+        self.counterexamples[0].extend(new_valid)
+        self.counterexamples[1].extend(new_invalid)
+        added = len(new_valid) + len(new_invalid)
+        if added > 0:
+            logger.info(f'Regex {regex_str} fails {len(missed_valid) + len(matched_invalid)} '
+                        f'examples. Added {added} of them.')
+        stats.counterexamples += added
+        stats.regex_synthesis_time += time.time() - check_start
+        return added > 0
+
+    @staticmethod
+    def _one_per_shape(examples: List[str]) -> List[str]:
+        return representatives(examples, len(set(map(shape, examples))), key=lambda ex: ex)
+
     def try_capture_conditions(self, regex):
         cap_conditions_synthesis_start = time.time()
         capture_conditions = self._capturer.synthesize_capture_conditions(regex)
@@ -284,15 +399,16 @@ class MultipleSynthesizer(ABC):
         if regex is None:
             return None
 
-        analysis_result = self._decider.analyze(regex)
+        with profiler.phase('analyze'):
+            analysis_result = self._decider.analyze(regex)
 
         if analysis_result.is_ok():  # program satisfies I/O examples
-            logger.info(
-                f'Regex accepted. {self._node_counter.eval(regex, [0])} nodes. '
-                f'{stats.enumerated_regexes} attempts '
-                f'and {round(time.time() - self.start_time, 2)} seconds:')
-            logger.info(self._printer.eval(regex))
-            self._enumerator.update()
+            logger.info('Regex accepted. %s nodes. %s attempts and %s seconds:',
+                        lazy(self._node_counter.eval, regex, [0]), stats.enumerated_regexes,
+                        round(time.time() - self.start_time, 2))
+            logger.info('%s', lazy(self._printer.eval, regex))
+            with profiler.phase('update'):
+                self._enumerator.update()
             stats.regex_synthesis_time += time.time() - regex_synthesis_start
             if stats.first_regex_time == -1:
                 stats.first_regex_time = time.time() - self.start_time
@@ -301,14 +417,23 @@ class MultipleSynthesizer(ABC):
 
         elif self.configuration.pruning:
             new_predicates = analysis_result.why()
+            if new_predicates is not None and logger.isEnabledFor(logging.DEBUG):
+                with profiler.phase('log'):
+                    for pred in new_predicates:
+                        pred_str = self._printer.eval(pred.args[0])
+                        if len(pred.args) > 1:
+                            pred_str = str(pred.args[1]) + " " + pred_str
+                        logger.debug(f'New predicate: {pred.name} {pred_str}')
+            if self.configuration.equivalence_pruning:
+                with profiler.phase('equivalence'):
+                    for subtree, tree_idx in self._decider.redundant_subtrees(regex):
+                        self._enumerator.block_equivalent(subtree, tree_idx)
+                        stats.equivalent_subtrees += 1
             if new_predicates is not None:
-                for pred in new_predicates:
-                    pred_str = self._printer.eval(pred.args[0])
-                    if len(pred.args) > 1:
-                        pred_str = str(pred.args[1]) + " " + pred_str
-                    logger.debug(f'New predicate: {pred.name} {pred_str}')
+                self._share_predicates(new_predicates)
         else:
             new_predicates = None
-        self._enumerator.update(new_predicates)
+        with profiler.phase('update'):
+            self._enumerator.update(new_predicates)
         stats.regex_synthesis_time += time.time() - regex_synthesis_start
         return -1
@@ -1,7 +1,11 @@
 import itertools
+import multiprocessing
+import queue
 import re
 import time
 from copy import deepcopy
+from functools import reduce
+from signal import signal, SIGINT, SIGTERM
 
 from forest.configuration import Configuration
 from forest.decider import RegexDecider
@@ -25,6 +29,20 @@ class MultiTreeSynthesizer(MultipleSynthesizer):
         self.main_dsl = main_dsl
         self.special_chars = {'.', '^', '$', '*', '+', '?', '\\', '|', '(', ')',
                               '{', '}', '[', ']', '"'}
+        # State of the parallel search: the tree DSLs of the static encoding, and the
+        # predicates shared between the workers so far.
+        self._tree_dsls = None
+        self._shared_predicates = []
+        self._shared_keys = set()
+        # Only set in the worker processes: the event that cancels the job and, if they
+        # share predicates, the queues to and from the parent, the index of the job, and
+        # the predicates not sent yet.
+        self._cancel = None
+        self._outbox = None
+        self._inbox = None
+        self._job_idx = None
+        self._unshared = []
+        self._last_share = 0.
 
     def synthesize(self):
         self.start_time = time.time()
@@ -35,9 +53,9 @@ class MultiTreeSynthesizer(MultipleSynthesizer):
             invalid = None
 
         if valid is not None and len(valid[0]) > 1 and not self.configuration.force_dynamic:
-            self._decider = RegexDecider(interpreter=RegexInterpreter(),
-                                         valid_examples=self.valid, invalid_examples=self.invalid,
-                                         split_valid=valid)
+            self._set_decider(RegexDecider(interpreter=RegexInterpreter(),
+                                           valid_examples=self.valid, invalid_examples=self.invalid,
+                                           split_valid=valid))
 
             self.valid = valid
             self.invalid = invalid
@@ -49,38 +67,335 @@ class MultiTreeSynthesizer(MultipleSynthesizer):
             builder = DSLBuilder(type_validations, self.valid, self.invalid)
             dsls = builder.build()
 
-            for depth in range(3, 10):
-                self._enumerator = StaticMultiTreeEnumerator(self.main_dsl, dsls, depth)
+            first_depth = 3
+            warm_depth, warm_length = self._warm_start_size()
+            if warm_length == len(dsls):
+                first_depth = min(max(first_depth, warm_depth), 9)
+            if self.configuration.processes > 1:
+                if self.configuration.incremental:
+                    logger.warning('The cubes are searched by separate enumerators. '
+                                   'Ignoring incremental.')
+                self._tree_dsls = dsls
+                cubes = self._cubes(dsls)
+                jobs = [(depth, cube) for depth in range(first_depth, 10) for cube in cubes]
+                return self._search_in_parallel(jobs, self._try_cube, lambda job: job[0],
+                                                share_predicates=True)
+            for depth in range(first_depth, 10):
+                if self.configuration.incremental and self._enumerator is not None:
+                    self._enumerator.deepen()
+                else:
+                    self._enumerator = StaticMultiTreeEnumerator(
+                        self.main_dsl, dsls, depth, incremental=self.configuration.incremental)
+                if self.warm_start_regex is not None:
+                    self._enumerator.seed(self.warm_start_regex)
                 depth_start = time.time()
                 self.try_for_depth()
                 stats.per_depth_times[depth] = time.time() - depth_start
                 if len(self.solutions) > 0:
                     self.terminate()
                     return self.solutions[0]
-                elif self.configuration.die:
+                elif self.stopped:
                     self.terminate()
                     return
 
         else:
-            self._decider = RegexDecider(RegexInterpreter(), self.valid, self.invalid)
+            self._set_decider(RegexDecider(RegexInterpreter(), self.valid, self.invalid))
             sizes = list(itertools.product(range(3, 10), range(1, 10)))
-            sizes.sort(key=lambda t: (2 ** t[0] - 1) * t[1])
+            sizes.sort(key=self._cell_cost)
+            if self.warm_start_regex is not None:
+                warm_cost = self._cell_cost(self._warm_start_size())
+                sizes = list(filter(lambda t: self._cell_cost(t) >= warm_cost, sizes))
+            if self.configuration.processes > 1:
+                return self._search_in_parallel(sizes, self._try_cell, lambda cell: cell)
             for dep, length in sizes:
-                self._enumerator = DynamicMultiTreeEnumerator(self.main_dsl, depth=dep,
-                                                              length=length)
-                depth_start = time.time()
-                self.try_for_depth()
-                stats.per_depth_times[(dep, length)] = time.time() - depth_start
+                self._try_cell(dep, length)
 
                 if len(self.solutions) > 0:
                     self.terminate()
                     return self.solutions[0]
-                elif self.configuration.die:
+                elif self.stopped:
                     self.terminate()
                     return
 
         return None
 
+    @staticmethod
+    def _cell_cost(cell):
+        """ Number of nodes of the dynamic multitree enumerator of the given size. """
+        depth, length = cell
+        return (2 ** depth - 1) * length
+
+    def _warm_start_size(self):
+        """ Depth and length of the warm start regex, below which the search can start,
+        or (0, 0) if the smaller sizes must be searched too: the previous examples may not
+        all be among the current ones, and then a smaller regex may satisfy them. """
+        if self.warm_start_regex is None or not self.warm_start_skips_smaller:
+            return 0, 0
+        return max(map(lambda t: t.depth(), self.warm_start_regex.children)), \
+               len(self.warm_start_regex.children)
+
+    def _try_cell(self, depth, length):
+        """ Search the programs of a dynamic multitree enumerator of the given size. """
+        self._enumerator = DynamicMultiTreeEnumerator(self.main_dsl, depth=depth,
+                                                      length=length)
+        if self.warm_start_regex is not None:
+            self._enumerator.seed(self.warm_start_regex)
+        depth_start = time.time()
+        self.try_for_depth()
+        stats.per_depth_times[(depth, length)] = time.time() - depth_start
+
+    def _cubes(self, dsls):
+        """
+        Split the search space of the static multitree encoding into disjoint cubes. Each
+        cube fixes the productions at the heads of the first trees, using as many trees as
+        needed to have at least 4 cubes per process.
+        """
+        domains = []
+        for dsl in dsls:
+            domains.append(list(map(lambda p: p.id, dsl.get_productions_with_lhs(dsl.output))))
+            if reduce(lambda n, d: n * len(d), domains, 1) >= 4 * self.configuration.processes:
+                break
+        return list(itertools.product(*domains))
+
+    def _try_cube(self, depth, cube):
+        """ Search the programs of a static multitree enumerator of the given depth whose
+        trees have the heads in cube. """
+        self._enumerator = StaticMultiTreeEnumerator(self.main_dsl, self._tree_dsls, depth)
+        self._enumerator.fix_heads(cube)
+        self._enumerator.learn(self._shared_predicates)
+        if self.warm_start_regex is not None:
+            self._enumerator.seed(self.warm_start_regex)
+        self.try_for_depth()
+
+    def _share_predicates(self, predicates):
+        if self._outbox is None:
+            return
+        self._unshared.extend(predicates)
+        if time.time() - self._last_share > 1:
+            self._flush_predicates()
+
+    def _flush_predicates(self):
+        """ Send the predicates learned since the last call to the parent process, which
+        forwards them to the other workers. """
+        if len(self._unshared) > 0:
+            self._outbox.put((self._job_idx, self._unshared))
+            self._unshared = []
+        self._last_share = time.time()
+
+    def enumerate(self):
+        if self._cancel is not None and self._cancel.is_set():
+            self.configuration.die = True
+        if self._inbox is not None:
+            received = []
+            while True:
+                try:
+                    received.extend(self._inbox.get_nowait())
+                except queue.Empty:
+                    break
+            if len(received) > 0:
+                self._enumerator.learn(received)
+        return super().enumerate()
+
+    def _run_in_worker(self, run_job, job_idx, job, results, learned, inbox, cancel):
+        """ Entry point of the worker processes of _search_in_parallel. The job stops
+        when cancel is set, and the results are still put in the queue, so that the worker
+        is never stopped while writing to it. """
+
+        def die_handler(received_signal, frame):
+            self.configuration.die = True
+
+        signal(SIGINT, die_handler)
+        signal(SIGTERM, die_handler)
+        self._cancel = cancel
+        if learned is not None:
+            self._outbox = learned
+            self._inbox = inbox
+            self._job_idx = job_idx
+            self._last_share = time.time()
+        enumerated = stats.enumerated_regexes
+        job_start = time.time()
+        try:
+            run_job(*job)
+        finally:
+            if learned is not None:
+                self._flush_predicates()
+            results.put((job_idx, self.solutions, self.first_regex, stats.first_regex_time,
+                         time.time() - job_start, stats.enumerated_regexes - enumerated,
+                         self.counterexamples))
+
+    def _forward_predicates(self, learned, inboxes):
+        """ Send the predicates reported by each worker to the other running workers, and
+        keep them for the workers started later. Predicates already shared are skipped. """
+        while True:
+            try:
+                sender, predicates = learned.get_nowait()
+            except queue.Empty:
+                return
+            new_predicates = []
+            for pred in predicates:
+                key = (pred.name, tuple(map(str, pred.args)))
+                if key not in self._shared_keys:
+                    self._shared_keys.add(key)
+                    new_predicates.append(pred)
+            if len(new_predicates) == 0:
+                continue
+            self._shared_predicates.extend(new_predicates)
+            stats.shared_predicates += len(new_predicates)
+            for idx, inbox in inboxes.items():
+                if idx != sender:
+                    inbox.put(new_predicates)
+
+    def _search_in_parallel(self, jobs, run_job, time_key, share_predicates=False):
+        """
+        Run several jobs at once, each in a worker process that calls run_job on it. The
+        consecutive jobs with the same time_key form a group, like the cubes of a depth.
+        A group's solutions are only committed once it and all previous groups are done,
+        so the solution comes from the first group that has one, whatever the timing of the
+        workers. With disambiguation, the solutions of the group, one per job, are told
+        apart as the solutions of a sequential search are. Otherwise, the solution is the
+        one with the fewest nodes, then the first printed regex. As soon as a job reports solutions, the jobs of later groups
+        are cancelled, and only the ones before it and in its group are waited for. Jobs
+        are cancelled through an event, and the queues are read until their workers exit,
+        as killing a worker while it writes to a queue could leave the queue unreadable.
+        The time of each job is added to stats.per_depth_times[time_key(job)].
+        If share_predicates, the predicates learned by each worker are forwarded to the
+        others while they run, and given to the workers started later.
+        """
+        if self.configuration.disambiguation and not self.configuration.self_interact:
+            logger.warning('Worker processes cannot interact with the user. '
+                           'Returning the first regex found.')
+            self.configuration.disambiguation = False
+        groups = []
+        for _, group in itertools.groupby(range(len(jobs)), lambda i: time_key(jobs[i])):
+            group = list(group)
+            groups.append(range(group[0], group[-1] + 1))
+        results = multiprocessing.Queue()
+        learned = multiprocessing.Queue() if share_predicates else None
+        running = {}
+        inboxes = {}
+        cancels = {}
+        # Workers that reported their results or were cancelled, until they exit.
+        exiting = {}
+        job_solutions = {}
+        next_idx = 0
+        committed = None
+        # End of the first group with a job that reported solutions. The jobs after it
+        # can no longer be committed, so they are not started, and cancelled if running.
+        end = len(jobs)
+        stopping = False
+        while True:
+            for group in groups:
+                if any(map(lambda i: i not in job_solutions, group)):
+                    break
+                committed = self._group_solutions(job_solutions, group)
+                if len(committed) > 0:
+                    break
+                committed = None
+            if committed is not None:
+                break
+
+            if self.stopped and not stopping:
+                stopping = True
+                for idx in running:
+                    cancels[idx].set()  # the results found so far are still reported
+
+            while not stopping and len(running) < self.configuration.processes \
+                    and next_idx < end:
+                inbox = None
+                if share_predicates:
+                    inbox = multiprocessing.Queue()
+                    inbox.cancel_join_thread()  # the worker may be gone before reading it
+                    inboxes[next_idx] = inbox
+                cancels[next_idx] = multiprocessing.Event()
+                process = multiprocessing.Process(target=self._run_in_worker,
+                                                  args=(run_job, next_idx, jobs[next_idx],
+                                                        results, learned, inbox,
+                                                        cancels[next_idx]))
+                process.start()
+                running[next_idx] = process
+                next_idx += 1
+            if len(running) == 0:
+                break
+
+            if share_predicates:
+                self._forward_predicates(learned, inboxes)
+            self._join_exited(exiting)
+            try:
+                idx, solutions, first_regex, first_regex_time, job_time, enumerated, \
+                    counterexamples = results.get(timeout=0.2 if share_predicates else 1)
+            except queue.Empty:
+                for idx, process in list(running.items()):
+                    if not process.is_alive():  # died without reporting
+                        running.pop(idx).join()
+                        inboxes.pop(idx, None)
+                        job_solutions[idx] = []
+                continue
+            if idx not in running:  # cancelled
+                continue
+            exiting[idx] = running.pop(idx)
+            inboxes.pop(idx, None)
+            job_solutions[idx] = solutions
+            key = time_key(jobs[idx])
+            stats.per_depth_times[key] = stats.per_depth_times.get(key, 0.) + job_time
+            stats.enumerated_regexes += enumerated
+            self.counterexamples[0].extend(counterexamples[0])
+            self.counterexamples[1].extend(counterexamples[1])
+            if len(solutions) > 0 and (self.first_regex is None or
+                                       first_regex_time < stats.first_regex_time):
+                self.first_regex = first_regex
+                stats.first_regex_time = first_regex_time
+            if len(solutions) > 0 and idx < end:
+                end = next(filter(lambda g: idx in g, groups)).stop
+                for later_idx in list(filter(lambda i: i >= end, running)):
+                    cancels[later_idx].set()
+                    exiting[later_idx] = running.pop(later_idx)
+                    inboxes.pop(later_idx, None)
+
+        # cancel the jobs that come after the committed group
+        for idx, process in running.items():
+            cancels[idx].set()
+            exiting[idx] = process
+        while len(exiting) > 0:
+            for channel in filter(None, (results, learned)):
+                try:
+                    channel.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self._join_exited(exiting)
+
+        if committed is None and stopping:
+            # interrupted: use the first group that found something
+            for group in groups:
+                committed = self._group_solutions(job_solutions, group)
+                if len(committed) > 0:
+                    break
+                committed = None
+        if committed is not None:
+            self.solutions = committed
+            if self.configuration.disambiguation and not stopping:
+                while len(self.solutions) > 1:
+                    self.distinguish()
+            self.terminate()
+            return self.solutions[0]
+        elif self.stopped:
+            self.terminate()
+        return None
+
+    @staticmethod
+    def _join_exited(exiting):
+        """ Join the workers of exiting that are no longer alive. """
+        for idx, process in list(exiting.items()):
+            if not process.is_alive():
+                exiting.pop(idx).join()
+
+    def _group_solutions(self, job_solutions, group):
+        """ Solutions of the finished jobs of group, with the fewest nodes first, then
+        by printed regex. """
+        solutions = list(itertools.chain(*map(lambda i: job_solutions.get(i, []), group)))
+        solutions.sort(key=lambda solution: (self._node_counter.eval(solution[0]),
+                                             self._decider.interpreter.eval(solution[0])))
+        return solutions
+
     def split_examples(self):
         max_l = max(map(lambda x: len(x[0]), self.valid))
         new_l = len(self.valid[0])
@@ -0,0 +1,210 @@
+import multiprocessing
+import os
+import queue
+import re
+import time
+from dataclasses import replace
+from signal import signal, SIGINT, SIGTERM
+
+from forest.configuration import Configuration
+from forest.logger import get_logger
+from forest.stats import stats_path
+from forest.visitor import RegexInterpreter
+
+logger = get_logger('forest')
+
+portfolio_encodings = ('multitree', 'dynamic', 'ktree', 'lines')
+
+
+def make_synthesizer(valid, invalid, captures, condition_invalid, dsl, ground_truth,
+                     configuration: Configuration):
+    """ Build the synthesizer for configuration.encoding. Only the modules of that
+    encoding are imported. """
+    if configuration.encoding == 'multitree':
+        from .multitree_synthesizer import MultiTreeSynthesizer
+        return MultiTreeSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                    ground_truth, configuration=configuration)
+    elif configuration.encoding == 'dynamic':
+        from .multitree_synthesizer import MultiTreeSynthesizer
+        configuration.force_dynamic = True
+        return MultiTreeSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                    ground_truth, configuration=configuration)
+    elif configuration.encoding == 'ktree':
+        from .ktree_synthesizer import KTreeSynthesizer
+        return KTreeSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                ground_truth, configuration=configuration)
+    elif configuration.encoding == 'lines':
+        from .lines_synthesizer import LinesSynthesizer
+        return LinesSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                ground_truth, configuration=configuration)
+    elif configuration.encoding == 'bottomup':
+        from .bottom_up_synthesizer import BottomUpSynthesizer
+        return BottomUpSynthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                   ground_truth, configuration=configuration)
+    else:
+        raise ValueError('Unknown encoding ' + configuration.encoding)
+
+
+def _synthesize_in_worker(results, valid, invalid, captures, condition_invalid, dsl,
+                          ground_truth, configuration: Configuration, warm_start=None,
+                          corpus=None):
+    """ Entry point of the portfolio worker processes. Puts (encoding, program,
+    counterexamples) in the results queue, where program is None if no solution was
+    found. """
+    program = None
+    counterexamples = ([], [])
+    try:
+        synthesizer = make_synthesizer(valid, invalid, captures, condition_invalid, dsl,
+                                       ground_truth, configuration)
+        if warm_start is not None:
+            synthesizer.warm_start(*warm_start)
+        if corpus is not None:
+            synthesizer.use_corpus(*corpus)
+            counterexamples = synthesizer.counterexamples
+
+        def die_handler(received_signal, frame):
+            synthesizer.configuration.die = True
+
+        signal(SIGINT, die_handler)
+        signal(SIGTERM, die_handler)
+        program = synthesizer.synthesize()
+    finally:
+        results.put((configuration.encoding, program, counterexamples))
+
+
+class PortfolioSynthesizer:
+    """ Runs one synthesizer per encoding in parallel, each on its own process, and
+    returns the first verified solution. The remaining synthesizers are killed. """
+
+    def __init__(self, valid_examples, invalid_examples, captured, condition_invalid, dsl,
+                 ground_truth, configuration: Configuration, encodings=portfolio_encodings):
+        self.valid = valid_examples
+        self.invalid = invalid_examples
+        self.captured = captured
+        self.condition_invalid = condition_invalid
+        self.dsl = dsl
+        self.ground_truth = ground_truth
+        self.configuration = configuration
+        self.encodings = encodings
+        # Seconds to wait for the synthesizers to exit when none of them won.
+        self.termination_timeout = 10
+
+        if configuration.disambiguation and not configuration.self_interact:
+            logger.warning('The portfolio cannot interact with the user. '
+                           'Returning the first regex found.')
+            self.configuration.disambiguation = False
+
+        self._printer = RegexInterpreter()
+        self.start_time = None
+        self._warm_start = None
+        self._corpus = None
+        # Valid and invalid examples that the workers added to the subset.
+        self.counterexamples = ([], [])
+
+    def warm_start(self, program, skip_smaller=False):
+        """ Resume the search of every synthesizer from a previous solution. """
+        self._warm_start = (program, skip_smaller)
+
+    @property
+    def stopped(self):
+        """ Whether the workers must stop, because the user interrupted them or because
+        synthesis must start over with new valid examples. """
+        return self.configuration.die or len(self.counterexamples[0]) > 0
+
+    def use_corpus(self, valid_examples, invalid_examples):
+        """ Make every synthesizer check its solutions against these examples, a
+        superset of the ones it was built with. """
+        self._corpus = (valid_examples, invalid_examples)
+
+    def synthesize(self):
+        self.start_time = time.time()
+        results = multiprocessing.Queue()
+        processes = {}
+        for encoding in self.encodings:
+            log_path = self.configuration.log_path
+            if len(log_path) > 0:
+                log_path += '.' + encoding
+            profile_path = self.configuration.profile_path
+            if len(profile_path) > 0:
+                profile_path += '.' + encoding
+            configuration = replace(self.configuration, encoding=encoding,
+                                    log_path=log_path, profile_path=profile_path)
+            process = multiprocessing.Process(
+                target=_synthesize_in_worker,
+                args=(results, self.valid, self.invalid, self.captured,
+                      self.condition_invalid, self.dsl, self.ground_truth, configuration,
+                      self._warm_start, self._corpus))
+            process.start()
+            processes[encoding] = process
+
+        winner, solution = None, None
+        pending = len(processes)
+        die_sent = False
+        while pending > 0 and solution is None:
+            if self.stopped and not die_sent:
+                self._stop(processes.values())
+                die_sent = True
+            try:
+                encoding, program, counterexamples = results.get(timeout=1)
+            except queue.Empty:
+                if not any(map(lambda p: p.is_alive(), processes.values())) \
+                        and results.empty():
+                    break  # all workers died without reporting
+                continue
+            pending -= 1
+            self.counterexamples[0].extend(counterexamples[0])
+            self.counterexamples[1].extend(counterexamples[1])
+            if program is None:
+                logger.info(f'Portfolio: {encoding} did not find a solution.')
+            elif not self.verify(program):
+                logger.warning(f'Portfolio: {encoding} returned a wrong solution.')
+            else:
+                winner, solution = encoding, program
+
+        for process in processes.values():
+            if winner is None:
+                process.join(self.termination_timeout)
+            # The losers may be stuck in a long solver check, where they do not see their
+            # die flag, so they are killed instead of waited for.
+            if process.is_alive():
+                process.kill()
+            process.join()
+
+        if winner is not None:
+            logger.info(f'Portfolio: {winner} won in '
+                        f'{round(time.time() - self.start_time, 2)} seconds.')
+        self._keep_log(winner)
+        return solution
+
+    def verify(self, program):
+        """ Check that the solution accepts all valid and rejects all invalid examples. """
+        regex = re.compile(self._printer.eval(program[0]))
+        valid, invalid = self._corpus if self._corpus is not None else (self.valid, self.invalid)
+        return all(map(lambda ex: regex.fullmatch(ex[0]) is not None, valid)) \
+               and not any(map(lambda ex: regex.fullmatch(ex[0]) is not None, invalid))
+
+    @staticmethod
+    def _stop(processes):
+        """ Ask the workers to stop, which sets configuration.die in each of them. """
+        for process in processes:
+            if process.pid is not None:
+                try:
+                    os.kill(process.pid, SIGTERM)
+                except ProcessLookupError:
+                    pass
+
+    def _keep_log(self, winner):
+        """ Keep only the log written by the winning synthesizer. """
+        if len(self.configuration.log_path) == 0:
+            return
+        for encoding in self.encodings:
+            log_path = self.configuration.log_path + '.' + encoding
+            for path, kept_path in ((log_path, self.configuration.log_path),
+                                    (stats_path(log_path),
+                                     stats_path(self.configuration.log_path))):
+                if not os.path.exists(path):
+                    continue
+                if encoding == winner:
+                    os.replace(path, kept_path)
+                else:
+                    os.remove(path)
@@ -9,7 +9,7 @@ from forest.decider import RegexDecider
 from forest.dsl import Node
 from forest.dsl.dsl_builder import DSLBuilder
 from forest.enumerator import DynamicMultiTreeEnumerator, StaticMultiTreeEnumerator
-from forest.logger import get_logger
+from forest.logger import get_logger, lazy
 from forest.stats import Statistics
 from forest.synthesizer import MultiTreeSynthesizer
 from forest.utils import transpose
@@ -67,7 +67,7 @@ class SketchSynthesizer(MultiTreeSynthesizer):
         if valid is not None and len(valid[0]) > 1 and not self.configuration.force_dynamic:
             # self.valid = valid
             # self.invalid = invalid
-            self._decider = RegexDecider(RegexInterpreter(), valid, invalid, split_valid=valid)
+            self._set_decider(RegexDecider(RegexInterpreter(), valid, invalid, split_valid=valid))
 
             assert all(map(lambda l: len(l) == len(valid[0]), valid))
             assert all(map(lambda l: len(l) == len(invalid[0]), invalid))
@@ -97,12 +97,12 @@ class SketchSynthesizer(MultiTreeSynthesizer):
                 if len(self.solutions) > 0:
                     self.terminate()
                     return self.solutions[0]
-                elif self.configuration.die:
+                elif self.stopped:
                     self.terminate()
                     return
 
         else:
-            self._decider = RegexDecider(RegexInterpreter(), valid, invalid)
+            self._set_decider(RegexDecider(RegexInterpreter(), valid, invalid))
             sizes = list(itertools.product(range(3, 10), range(1, 10)))
             sizes.sort(key=lambda t: (2 ** t[0] - 1) * t[1])
             for dep, length in sizes:
@@ -127,7 +127,7 @@ class SketchSynthesizer(MultiTreeSynthesizer):
                 if len(self.solutions) > 0:
                     self.terminate()
                     return self.solutions[0]
-                elif self.configuration.die:
+                elif self.stopped:
                     self.terminate()
                     return
 
@@ -140,7 +140,7 @@ class SketchSynthesizer(MultiTreeSynthesizer):
         if sketch is None:
             return None
 
-        logger.info(f'Sketch: {self._printer.eval(sketch, [0])}')
+        logger.info('Sketch: %s', lazy(self._printer.eval, sketch, [0]))
 
         if self.configuration.sketching == 'brute-force':
             filled = self.fill_brute_force(sketch)
@@ -158,12 +158,11 @@ class SketchSynthesizer(MultiTreeSynthesizer):
 
         if len(filled) > 0:
             self.count_good_sketches += 1
-            logger.info(f'Sketch accepted. {self._printer.eval(sketch)}. '
-                        f'{len(filled)} concrete programs.')
+            logger.info('Sketch accepted. %s. %s concrete programs.',
+                        lazy(self._printer.eval, sketch), len(filled))
             for program in filled:
-                logger.info(
-                    f'Program accepted. {self._printer.eval(program)}. '
-                    f'{self._node_counter.eval(program, [0])} nodes.')
+                logger.info('Program accepted. %s. %s nodes.', lazy(self._printer.eval, program),
+                            lazy(self._node_counter.eval, program, [0]))
                 # f'{self.num_enumerated} attempts '
                 # f'and {round(time.time() - self.start_time, 2)} seconds:')
 
@@ -0,0 +1,24 @@
+import unittest
+
+from forest.configuration import Configuration
+from forest.parse_examples import split_captures
+from forest.solution_cache import verify_solution
+from .cegis import synthesize_examples
+
+
+class TestBottomUpSynthesizer(unittest.TestCase):
+
+    def test_capture_conditions(self):
+        valid = [['7'], ['12'], ['3'], ['10'], ['1'], ['11']]
+        invalid = [['a'], ['1b'], ['123'], ['1.']]
+        condition_invalid = [['13'], ['25'], ['0'], ['20']]
+        configuration = Configuration(encoding='bottomup', self_interact=True)
+        program = synthesize_examples(valid, invalid, condition_invalid,
+                                      '[0-9]{1,2}, $0 <= 12, $0 >= 1', configuration)
+        self.assertIsNotNone(program)
+        self.assertTrue(verify_solution(program, *split_captures(valid, invalid,
+                                                                 condition_invalid)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+from forest.configuration import Configuration
+from forest.parse_examples import parse_file, split_captures
+from forest.solution_cache import verify_solution
+from forest.utils import check_conditions
+from .cegis import synthesize_examples
+
+benchmarks = os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks')
+forest_main = os.path.join(os.path.dirname(__file__), '..', '..', 'forest.py')
+
+
+class TestSynthesizeExamples(unittest.TestCase):
+
+    def test_deduplicate(self):
+        valid = [['12.30'], ['1.05'], ['300.99'], ['7.00'], ['45.10'], ['8.25']]
+        invalid = [['1.1'], ['a.00'], ['12'], ['.05'], ['3.456']]
+        configuration = Configuration(deduplicate=True, disambiguation=False)
+        program = synthesize_examples(valid, invalid, [], '', configuration)
+        self.assertIsNotNone(program)
+        self.assertTrue(verify_solution(program, *split_captures(valid, invalid, [])))
+
+    def test_cegis_capture_conditions(self):
+        # The regexes of the subset can leave the conditioned groups unmatched on the
+        # examples added later, and the capture conditions must skip them. Runs the
+        # command line in its own process: the regexes found depend on the terms that
+        # earlier tests created in z3's global context.
+        instance = os.path.join(benchmarks, 'date2.txt')
+        result = subprocess.run([sys.executable, forest_main, instance, '--cegis', '3', '-s'],
+                                cwd=os.path.dirname(forest_main), capture_output=True,
+                                text=True, timeout=600)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('Solution:\n', result.stdout)
+        output = result.stdout.split('Solution:\n')[-1].strip().split(', ')
+        regex, conditions = re.compile(output[0]), output[1:]
+
+        def accepts(example):
+            match = regex.fullmatch(example[0])
+            return match is not None and (len(conditions) == 0 or
+                                          check_conditions(conditions, match))
+
+        valid, invalid, condition_invalid, _ = parse_file(instance)
+        self.assertTrue(all(map(accepts, valid)))
+        self.assertFalse(any(map(accepts, invalid + condition_invalid)))
+
+
+if __name__ == '__main__':
+    unittest.main()
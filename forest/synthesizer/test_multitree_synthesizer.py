@@ -0,0 +1,45 @@
+import multiprocessing
+import os
+import re
+import unittest
+
+from forest.configuration import Configuration
+from forest.parse_examples import parse_file, split_captures
+from forest.solution_cache import verify_solution
+from forest.visitor import RegexInterpreter
+from .cegis import synthesize_examples
+
+benchmarks = os.path.join(os.path.dirname(__file__), '..', '..', 'benchmarks')
+
+
+class TestParallelSearch(unittest.TestCase):
+
+    def _synthesize(self, instance, **options):
+        valid, invalid, condition_invalid, ground_truth = \
+            parse_file(os.path.join(benchmarks, instance))
+        program = synthesize_examples(valid, invalid, condition_invalid, ground_truth,
+                                      Configuration(**options))
+        self.assertIsNotNone(program)
+        self.assertTrue(verify_solution(program, *split_captures(valid, invalid,
+                                                                 condition_invalid)))
+        return program
+
+    def test_cells(self):
+        self._synthesize('dec.txt', encoding='dynamic', processes=2, disambiguation=False)
+        # the cancelled workers have exited
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_cubes(self):
+        self._synthesize('time1.txt', processes=2, disambiguation=False)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_cubes_disambiguation(self):
+        # Each cube returns its own solution, which must be told apart from the others'.
+        regex = self._synthesize('date2.txt', self_interact=True, processes=2)[0]
+        regex_str = RegexInterpreter().eval(regex)
+        self.assertIsNone(re.fullmatch(regex_str, '1/1/12'))
+        self.assertIsNone(re.fullmatch(regex_str, '//12'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import re
+import time
+import unittest
+
+from .server import SynthesisServer, _make_configuration
+
+
+class TestSynthesisServer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SynthesisServer(workers=1, answer_timeout=1)
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def _wait(self, request_id, timeout=300):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            request = self.server.status(request_id)
+            if request['status'] in ('done', 'failed', 'question'):
+                return request
+            time.sleep(0.1)
+        self.fail(f'Request {request_id} did not finish.')
+
+    def test_synthesize(self):
+        valid = ['12.30', '1.05', '300.99', '7.00']
+        invalid = ['1.1', 'a.00', '12', '.05']
+        request_id = self.server.submit({'valid': valid, 'invalid': invalid,
+                                         'configuration': {'disambiguation': False}})
+        request = self._wait(request_id)
+        self.assertEqual(request['status'], 'done')
+        self.assertIsNotNone(request['solution'])
+        solution = re.compile(request['solution'])
+        self.assertTrue(all(map(lambda ex: solution.fullmatch(ex), valid)))
+        self.assertFalse(any(map(lambda ex: solution.fullmatch(ex), invalid)))
+
+    def test_invalid_requests(self):
+        with self.assertRaises(ValueError):
+            self.server.submit({'valid': []})
+        with self.assertRaises(ValueError):
+            self.server.submit({'valid': ['1'], 'configuration': {'die': True}})
+        self.assertIsNone(self.server.status('unknown'))
+        self.assertFalse(self.server.answer('unknown', 'yes'))
+
+
+class TestConfiguration(unittest.TestCase):
+
+    def test_make_configuration(self):
+        self.assertEqual(_make_configuration({'processes': 2}).processes, 2)
+        with self.assertRaises(ValueError):
+            _make_configuration({'cache_path': 'cache.db'})
+
+
+if __name__ == '__main__':
+    unittest.main()
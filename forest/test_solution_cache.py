@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from .configuration import Configuration
+from .dsl import Builder
+from .parse_examples import preprocess
+from .solution_cache import SolutionCache, solution_key, warm_start_key, example_sets
+
+
+class TestSolutionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.valid, self.invalid, self.condition_invalid, self.captures = \
+            [['12'], ['345']], [['a'], ['1a']], [], [[], []]
+        self.dsl = preprocess(self.valid, self.invalid, self.condition_invalid)[0]
+        builder = Builder(self.dsl)
+        digit = builder.make_apply('re', [builder.make_enum('RegexLit', '[0-9]')])
+        self.program = (builder.make_apply('posit', [digit]), [], ([], []))
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SolutionCache(os.path.join(self.directory.name, 'cache.sqlite'))
+
+    def tearDown(self):
+        self.cache.close()
+        self.directory.cleanup()
+
+    def _key(self, **options):
+        return solution_key(self.valid, self.invalid, self.condition_invalid, self.captures,
+                            Configuration(**options))
+
+    def test_key(self):
+        self.assertEqual(self._key(), self._key(log_path='log'))
+        self.assertNotEqual(self._key(), self._key(encoding='ktree'))
+        self.assertNotEqual(self._key(), self._key(processes=2))
+        self.assertEqual(solution_key(list(reversed(self.valid)), self.invalid,
+                                      self.condition_invalid, list(reversed(self.captures)),
+                                      Configuration()), self._key())
+
+    def test_key_effective_disambiguation(self):
+        # Searches in worker processes turn disambiguation off unless self_interact.
+        self.assertEqual(self._key(processes=2), self._key(processes=2, disambiguation=False))
+        self.assertEqual(self._key(encoding='portfolio'),
+                         self._key(encoding='portfolio', disambiguation=False))
+        self.assertNotEqual(self._key(processes=2, self_interact=True),
+                            self._key(processes=2, self_interact=True, disambiguation=False))
+        self.assertNotEqual(self._key(), self._key(disambiguation=False))
+
+    def test_get(self):
+        key = self._key()
+        examples = (self.valid, self.invalid, self.condition_invalid, self.captures)
+        self.assertIsNone(self.cache.get(key, *examples))
+        self.cache.put(key, self.program)
+        self.assertIsNotNone(self.cache.get(key, *examples))
+        # a cached solution that no longer satisfies the examples is discarded
+        self.assertIsNone(self.cache.get(key, self.valid, self.invalid + [['67']],
+                                         self.condition_invalid, self.captures))
+        self.assertIsNone(self.cache.get(key, *examples))
+
+    def test_get_latest(self):
+        context = warm_start_key(Configuration(), self.dsl)
+        examples = example_sets(self.valid, self.invalid, self.condition_invalid,
+                                self.captures)
+        self.cache.put(self._key(), self.program, 'instance', examples, context)
+        program, latest_examples = self.cache.get_latest('instance', context)
+        self.assertEqual(str(program[0]), str(self.program[0]))
+        self.assertEqual(latest_examples, examples)
+        self.assertIsNone(self.cache.get_latest('other', context))
+        # not resumed with another configuration or DSL
+        self.assertIsNone(self.cache.get_latest(
+            'instance', warm_start_key(Configuration(encoding='ktree'), self.dsl)))
+        other_dsl = preprocess([['12'], ['3.45']], self.invalid, self.condition_invalid)[0]
+        self.assertIsNone(self.cache.get_latest(
+            'instance', warm_start_key(Configuration(), other_dsl)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import re
+import unittest
+
+from .utils import check_conditions
+
+
+class TestCheckConditions(unittest.TestCase):
+
+    def test_conditions(self):
+        match = re.fullmatch(r'([0-9]+)/([0-9]+)', '31/12')
+        self.assertTrue(check_conditions(['$0 <= 31', '$1 <= 12'], match))
+        self.assertFalse(check_conditions(['$0 <= 31', '$1 <= 11'], match))
+
+    def test_unmatched_group(self):
+        match = re.fullmatch(r'(?:([0-9]+)|x)/([0-9]+)', 'x/12')
+        self.assertTrue(check_conditions(['$0 >= 1', '$1 <= 12'], match))
+        self.assertFalse(check_conditions(['$0 >= 1', '$1 <= 11'], match))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,6 @@ import operator
 import re
 from typing import List
 
-import z3
-
 condition_operators = {'<=': operator.le, '>=': operator.ge}
 yes_values = {"yes", "valid", "true", "1", "+", "v", "y", "t"}
 no_values = {"no", "invalid", "false", "0", "-", "i", "n", "f"}
@@ -63,38 +61,74 @@ def transpose(lst):
     return list(map(list, zip(*lst)))
 
 
-def find_lcs(strings):
-    """ Find longest common substring of all strings in list """
-
-    num_strings = len(strings)
-
-    # Take first word from array as reference
-    len_0 = len(strings[0])
-    results = set()
-
-    for i in range(len_0):
-        for j in range(i + 1, len_0 + 1):
-
-            # generating all possible substrings of our reference strings[0] i.e s
-            stem = strings[0][i:j]
-            stem_in_all_strings = True
-            for k in range(1, num_strings):
-                # Check if the generated stem is common to all words
-                if stem not in strings[k]:
-                    stem_in_all_strings = False
-                    break
+def _suffix_automaton(string):
+    """ Builds the suffix automaton of a string. Returns, for each state, its transitions,
+    suffix link, length of its longest substring, and the end position of that substring's
+    first occurrence. """
+    transitions, link, length, end_pos = [{}], [-1], [0], [-1]
+    last = 0
+    for pos, char in enumerate(string):
+        cur = len(length)
+        transitions.append({})
+        link.append(0)
+        length.append(length[last] + 1)
+        end_pos.append(pos)
+        p = last
+        while p != -1 and char not in transitions[p]:
+            transitions[p][char] = cur
+            p = link[p]
+        if p != -1:
+            q = transitions[p][char]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = len(length)
+                transitions.append(dict(transitions[q]))
+                link.append(link[q])
+                length.append(length[p] + 1)
+                end_pos.append(end_pos[q])
+                while p != -1 and transitions[p].get(char) == q:
+                    transitions[p][char] = clone
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        last = cur
+    return transitions, link, length, end_pos
 
-            # If current substring is present in all strings and its length is greater
-            # than current result
-            if stem_in_all_strings:
-                if len(results) == 0:
-                    results = {stem}
-                elif len(next(iter(results))) < len(stem):
-                    results = {stem}
-                elif len(next(iter(results))) == len(stem):
-                    results.add(stem)
 
-    return list(results)
+def find_lcs(strings):
+    """ Find longest common substring of all strings in list """
+    transitions, link, length, end_pos = _suffix_automaton(strings[0])
+    # States sorted by decreasing length, so that every state comes before its suffix link.
+    order = sorted(range(1, len(length)), key=lambda v: length[v], reverse=True)
+
+    # common[v] is how long the substrings of state v can be while still occurring in all
+    # the strings seen so far.
+    common = length.copy()
+    for string in strings[1:]:
+        matched = [0] * len(length)
+        state, match_len = 0, 0
+        for char in string:
+            while state != 0 and char not in transitions[state]:
+                state = link[state]
+                match_len = length[state]
+            if char in transitions[state]:
+                state = transitions[state][char]
+                match_len += 1
+            if match_len > matched[state]:
+                matched[state] = match_len
+        for v in order:
+            if matched[v] > 0:
+                # A match ending in v also ends in all its suffixes.
+                matched[link[v]] = max(matched[link[v]], min(matched[v], length[link[v]]))
+            common[v] = min(common[v], matched[v])
+
+    lcs_len = max((common[v] for v in order), default=0)
+    if lcs_len == 0:
+        return []
+    # Each state holds at most one substring of each length, so no duplicates are found.
+    ends = sorted(end_pos[v] for v in order if common[v] == lcs_len)
+    return [strings[0][end - lcs_len + 1:end + 1] for end in ends]
 
 
 def find_all_cs(strings):
@@ -115,6 +149,69 @@ def find_all_cs(strings):
                 common_chars.extend(substrings)
 
 
+def shape(string):
+    """ Character-class signature of a string: digits become '9', lowercase letters 'a'
+    and uppercase letters 'A', other characters are kept. """
+    return string.translate(_shape_table)
+
+
+_shape_table = str.maketrans('0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ',
+                             '9' * 10 + 'a' * 26 + 'A' * 26)
+
+
+def representatives(examples, max_count, key=lambda ex: ex[0]):
+    """ Picks up to max_count examples with as many different shapes as possible. Shapes
+    are visited from the most to the least frequent, taking one example of each shape in
+    turn. Within a shape, examples with characters that the previous ones do not have at
+    the same positions are taken first. """
+    by_shape = {}
+    for ex in examples:
+        by_shape.setdefault(shape(key(ex)), []).append(ex)
+    groups = sorted(by_shape.values(), key=len, reverse=True)
+    iterators = list(map(lambda group: _diverse_first(group, key), groups))
+    ret = []
+    while len(iterators) > 0:
+        for iterator in list(iterators):
+            if len(ret) >= max_count:
+                return ret
+            ex = next(iterator, None)
+            if ex is None:
+                iterators.remove(iterator)
+            else:
+                ret.append(ex)
+    return ret
+
+
+def diverse_by_shape(examples, key=lambda ex: ex[0]):
+    """ Indices of the examples that have a character at a position where no previous
+    example of the same shape has it. Every example shares its shape and, at each position,
+    its character with some selected example. """
+    seen = {}
+    ret = []
+    for idx, ex in enumerate(examples):
+        string = key(ex)
+        chars = set(enumerate(string))
+        shape_seen = seen.setdefault(shape(string), set())
+        if not chars <= shape_seen:
+            shape_seen |= chars
+            ret.append(idx)
+    return ret
+
+
+def _diverse_first(examples, key):
+    """ Yields the examples that add a character at a new position, then the others. """
+    seen = set()
+    rest = []
+    for ex in examples:
+        chars = set(enumerate(key(ex)))
+        if chars <= seen:
+            rest.append(ex)
+        else:
+            seen |= chars
+            yield ex
+    yield from rest
+
+
 def all_sublists(iterable, min_len=-1, max_len=-1):
     """ Generate all possible sublists of iterable of size min_len up to max_len. """
     if min_len < 0:
@@ -144,12 +241,14 @@ def all_sublists_n(iterable, n):
 
 
 def make_z3_and(args: List):
+    import z3  # imported here so that the other helpers do not load the SMT solver
     if len(args) == 1:
         return args[0]
     return z3.And(args)
 
 
 def z3_abs(x):
+    import z3
     return z3.If(x >= 0, x, -x)
 
 
@@ -166,6 +265,8 @@ def check_conditions(conditions, match):
         group_idx = int(condition[0].replace("$", "", 1))
         op = condition_operators[condition[1]]
         value = int(condition[2])
+        if match.groups()[group_idx] is None:  # The group is not part of the match
+            continue
         try:
             string_value = int(match.groups()[group_idx])
         except ValueError:  # The text in the regex is not a valid integer
@@ -1,7 +1,14 @@
+import importlib
+
 from .context import Context
 from .error import InterpreterError, GeneralError, AssertionViolation
 from .interpreter import Interpreter
 from .node_counter import NodeCounter
 from .post_order import PostOrderInterpreter
 from .regex_interpreter import RegexInterpreter
-from .to_z3 import ToZ3
+
+
+def __getattr__(name):
+    if name == 'ToZ3':  # imported on first access, since it loads the SMT solver
+        return importlib.import_module('.to_z3', __name__).ToZ3
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+""" Measures the cost per candidate of the debug logging of the synthesis loop, when the
+messages are formatted eagerly with f-strings and lazily with forest.logger.lazy. """
+
+import argparse
+import os
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+os.chdir(root)
+
+from forest.enumerator import KTreeEnumerator  # noqa: E402
+from forest.logger import get_logger, lazy  # noqa: E402
+from forest.parse_examples import parse_file, preprocess  # noqa: E402
+from forest.visitor import RegexInterpreter  # noqa: E402
+
+logger = get_logger('forest')
+
+
+def enumerate_programs(examples_file, count, depth):
+    """ The first count programs of the k-tree enumerator for the examples. """
+    valid, invalid, condition_invalid, _ = parse_file(examples_file)
+    dsl = preprocess(valid, invalid, condition_invalid)[0]
+    enumerator = KTreeEnumerator(dsl, depth)
+    programs = []
+    while len(programs) < count:
+        program = enumerator.next()
+        if program is None:
+            break
+        programs.append(program)
+        enumerator.update()
+    return programs
+
+
+def time_per_call(log, programs, repeat):
+    """ Median time, in microseconds, of logging each program. """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for program in programs:
+            log(program)
+        times.append((time.perf_counter() - start) / len(programs) * 1e6)
+    return sorted(times)[len(times) // 2]
+
+
+# noinspection PyTypeChecker
+def main():
+    parser = argparse.ArgumentParser(description='Validations Synthesizer logging benchmark',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('file', type=str, nargs='?', default='benchmarks/date2.txt',
+                        help='File with I/O examples.')
+    parser.add_argument('-n', '--programs', type=int, default=500, help='Programs to log.')
+    parser.add_argument('-d', '--depth', type=int, default=4, help='Depth of the programs.')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Runs of each variant.')
+    args = parser.parse_args()
+
+    programs = enumerate_programs(args.file, args.programs, args.depth)
+    printer = RegexInterpreter()
+    logger.setLevel("INFO")
+
+    def eager(program):
+        logger.debug(f'Enumerator generated: {printer.eval(program)}')
+
+    def deferred(program):
+        logger.debug('Enumerator generated: %s', lazy(printer.eval, program))
+
+    print(f'{len(programs)} programs of depth at most {args.depth}, logged at INFO level:')
+    eager_time = time_per_call(eager, programs, args.repeat)
+    lazy_time = time_per_call(deferred, programs, args.repeat)
+    print(f'{"eager f-string":<20} {eager_time:8.2f} us per candidate')
+    print(f'{"lazy":<20} {lazy_time:8.2f} us per candidate')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+""" Measures the startup time of forest.py and the import time of the forest modules. """
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+modules = ('forest', 'forest.configuration', 'forest.parse_examples', 'forest.solution_cache',
+           'forest.spec', 'forest.spec.do_parse', 'forest.synthesizer.multitree_synthesizer')
+
+
+def time_command(command, runs):
+    """ Median wall-clock time, in milliseconds, of running the command. """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+# noinspection PyTypeChecker
+def main():
+    parser = argparse.ArgumentParser(description='Validations Synthesizer startup benchmark',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-r', '--runs', type=int, default=10, help='Runs of each command.')
+    parser.add_argument('-c', '--cache', metavar='FILE', type=str, default='',
+                        help='Also time a cache hit on benchmarks/pc_pt.txt with this cache.')
+    args = parser.parse_args()
+
+    python = sys.executable
+    print(f'{"python -c pass":<50} {time_command([python, "-c", "pass"], args.runs):8.1f} ms')
+    for module in modules:
+        command = [python, '-c', f'import {module}']
+        print(f'{"import " + module:<50} {time_command(command, args.runs):8.1f} ms')
+    command = [python, 'forest.py', '--help']
+    print(f'{"forest.py --help":<50} {time_command(command, args.runs):8.1f} ms')
+    if len(args.cache) > 0:
+        command = [python, 'forest.py', '-s', '-c', args.cache, 'benchmarks/pc_pt.txt']
+        subprocess.run(command, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print(f'{"forest.py (cache hit)":<50} {time_command(command, args.runs):8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
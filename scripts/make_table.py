@@ -1,5 +1,7 @@
 import argparse
 import glob
+import json
+import os
 import re
 import sys
 from typing import List
@@ -280,6 +282,32 @@ def read_regel_log(instance, regel_log_dir):
 
 
 def read_log(log_file):
+    """ Reads the JSON record written next to the log if there is one, and the text log
+    otherwise. """
+    if os.path.exists(log_file + '.json'):
+        return read_json_log(log_file)
+    return read_text_log(log_file)
+
+
+def read_json_log(log_file):
+    instance_name = list(filter(None, log_file.split('/')))[-1]
+    for excluded in exclude_instances:
+        if excluded in instance_name:
+            return None
+    instance = Instance(instance_name)
+    with open(log_file + '.json') as f:
+        record = json.load(f)
+    for col in all_columns:
+        if col in record:
+            instance.values[col] = record[col]
+    instance.values['per_depth_times'] = record['per_depth_times']
+    instance.values['num_cap_groups'] = record['num_cap_groups']
+    if record['solution'] is None:
+        instance.values['solution'] = 'No solution'
+    return instance
+
+
+def read_text_log(log_file):
     instance_name = list(filter(None, log_file.split('/')))[-1]
     for excluded in exclude_instances:
         if excluded in instance_name:
@@ -20,7 +20,8 @@ def handler(signal_received, frame):
 # noinspection PyTypeChecker
 def main():
     signal(SIGINT, handler)
-    encodings = ('multitree', 'dynamic', 'ktree', 'lines', 'compare-times')
+    encodings = ('multitree', 'dynamic', 'ktree', 'lines', 'bottomup', 'portfolio',
+                 'compare-times')
     sketching = ('none', 'smt', 'brute-force', 'hybrid')
 
     parser = argparse.ArgumentParser(description='Validations Synthesizer tester',
@@ -37,6 +38,10 @@ def main():
                         help='Show output.', default=False)
     parser.add_argument('--solve-only', type=int, default=-1,
                         help='Limit the number of solved instances. -1: unlimited.')
+    parser.add_argument('-w', '--warm', action='store_true',
+                        help='Run the tasks on worker processes that import forest once.')
+    parser.add_argument('-r', '--results', metavar='FILE', type=str, default='',
+                        help='Append the result of each task to FILE as a JSON line.')
 
     synth_group = parser.add_argument_group(title="Synthesizer options")
     synth_group.add_argument('-e', '--encoding', metavar='|'.join(encodings), type=str,
@@ -66,8 +71,10 @@ def main():
 
     tester = TaskRunner(args.directories, args.encoding, args.no_pruning, args.no_captures,
                         args.no_conditions, args.sketch, args.processes, args.timeout, args.out,
-                        args.resnax, args.max_examples, args.solve_only, args.log)
+                        args.resnax, args.max_examples, args.solve_only, args.log,
+                        args.warm, args.results)
     tester.run()
+    tester.print_results()
 
 
 if __name__ == '__main__':
@@ -1,21 +1,27 @@
 import datetime
 import glob
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import queue
 import random
 import socket
 import subprocess
+import sys
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
+from signal import signal, SIGINT, SIG_IGN
 
 from termcolor import colored
 
-all_methods = ('multitree', 'ktree', 'lines', 'dynamic')
+all_methods = ('multitree', 'ktree', 'lines', 'dynamic', 'bottomup')
 MAXSIGTERMS = 10
 
-
-def half_true():
-    n = 0
-    while True:
-        yield n % 4 == 0
-        n += 1
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 def nice_time(seconds):
@@ -40,26 +46,170 @@ class Instance:
         return self.name
 
 
+def _serve_tasks(connection):
+    """ Entry point of the warm workers. Runs forest.py's main on each list of arguments
+    received, and sends back its return code and output. """
+    signal(SIGINT, SIG_IGN)  # the runner stops the workers
+    sys.path.insert(0, root)
+    # forest.py is shadowed by the forest package, so it is loaded from its path.
+    spec = importlib.util.spec_from_file_location('forest_main', os.path.join(root, 'forest.py'))
+    forest_main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(forest_main)
+    import forest.synthesizer  # noqa: F401, forest.py imports it only when synthesizing
+    from forest.profiler import profiler
+    from forest.stats import Statistics
+    log_level = forest_main.logger.level
+    while True:
+        args = connection.recv()
+        if args is None:
+            break
+        sys.argv = ['forest.py'] + args
+        forest_main.synthesizer = None
+        forest_main.logger.setLevel(log_level)
+        Statistics.get_statistics().reset()
+        profiler.reset()
+        output = io.StringIO()
+        returncode = 0
+        with redirect_stdout(output), redirect_stderr(output):
+            try:
+                forest_main.main()
+            except SystemExit as e:
+                returncode = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+        connection.send((returncode, output.getvalue()))
+
+
+class WarmWorker:
+    """ Process that imports forest once and runs many tasks, saving the interpreter
+    startup and the imports that each python3 forest.py pays. It is not a daemon, as the
+    tasks can start processes of their own, so it must be stopped. """
+
+    def __init__(self):
+        self.process = None
+        self.connection = None
+        self._start()
+
+    def _start(self):
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve_tasks, args=(child_connection,))
+        self.process.start()
+
+    def send(self, args):
+        self.connection.send(args)
+
+    def wait(self, timeout):
+        """ Waits for the result of the current task. Returns None if it is not ready
+        within timeout seconds. """
+        try:
+            if self.connection.poll(timeout):
+                return self.connection.recv()
+        except EOFError:  # the worker died
+            self.process.join()
+            self._start()
+            return -1, ''
+        return None
+
+    def terminate(self):
+        """ Stops the current task like Task.terminate stops a process, returning its
+        result. Restarts the worker if it had to be killed. """
+        count = 0
+        while self.process.is_alive() and count < MAXSIGTERMS:
+            self.process.terminate()  # forest prints the last program found and returns
+            count += 1
+            result = self.wait(2)
+            if result is not None:
+                print(f"Sent SIGTERM x {count}.")
+                return result
+        print(f"Sent SIGTERM x {count}.")
+        print("Sending SIGKILL.")
+        self.process.kill()
+        self.process.join()
+        self._start()
+        return -9, ''
+
+    def stop(self):
+        """ Sends the worker the sentinel that ends it, and waits for it to exit. If it is
+        still running a task, the task is stopped first. """
+        if self.process.is_alive():
+            try:
+                self.connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(5)
+        if self.process.is_alive():
+            self.terminate()
+            self.connection.send(None)
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
 class Task:
     def __init__(self, command, instance, timeout):
         self.command = command
         self.instance = instance
         self.process = None
+        self.worker = None
         self.start_time = 0
+        self.elapsed = 0
         self.timeout = timeout
+        self.timed_out = False
+        self.returncode = None
+        self.output = []
 
         enc_idx = self.command.index('-e')
         self.encoding = self.command[enc_idx + 1]
 
-    def run(self):
-        print(f"Running {self.instance} {self.encoding}: {' '.join(self.command)}")
-        self.process = subprocess.Popen(self.command,
-                                        stdout=subprocess.PIPE,
-                                        stderr=subprocess.PIPE)
+    def run(self, worker=None):
+        """ Runs the task until it finishes or times out, on the warm worker if given and
+        in a new process otherwise. """
         self.start_time = time.time()
+        if worker is None:
+            print(f"Running {self.instance} {self.encoding}: {' '.join(self.command)}")
+            self.process = subprocess.Popen(self.command,
+                                            stdout=subprocess.PIPE,
+                                            stderr=subprocess.PIPE)
+            self.wait()
+            po, pe = self.process.communicate()
+            self.returncode = self.process.returncode
+            self.output = str(pe, encoding='utf-8').splitlines() + \
+                          str(po, encoding='utf-8').splitlines()
+        else:
+            args = self.command[self.command.index('forest.py') + 1:]
+            print(f"Running {self.instance} {self.encoding} on worker {worker.process.pid}: "
+                  f"forest.py {' '.join(args)}")
+            self.worker = worker
+            worker.send(args)
+            result = worker.wait(self.timeout)
+            if result is None:
+                print(colored(f"{self.instance} timed out.", "red"))
+                self.timed_out = True
+                result = worker.terminate()
+            self.worker = None
+            self.returncode, output = result
+            self.output = output.splitlines()
+        self.elapsed = time.time() - self.start_time
 
     def terminate(self):
         global MAXSIGTERMS
+        worker = self.worker
+        if worker is not None:
+            # The thread running the task collects its result, or restarts the worker.
+            count = 0
+            while self.worker is worker and count < MAXSIGTERMS:
+                worker.process.terminate()
+                time.sleep(2)
+                count += 1
+            print(f"Sent SIGTERM x {count}.")
+            if self.worker is worker:
+                print("Sending SIGKILL.")
+                worker.process.kill()
+            return
+        if self.process is None:  # not started, or ran on a worker
+            return
         count = 0
         while self.process.poll() is None and count < MAXSIGTERMS:
             self.process.terminate()
@@ -70,47 +220,49 @@ class Task:
             print("Sending SIGKILL.")
             self.process.kill()
 
-    def is_done(self):
-        """ Checks if task is done or has timed out. """
-        elapsed = time.time() - self.start_time
-        if elapsed >= self.timeout:
-            print(colored(f"{self.instance} timed out.", "red"))
-            self.terminate()
-            return True
-        return self.process.poll() is not None
-
     def wait(self):
         try:
             self.process.wait(timeout=self.timeout)
         except subprocess.TimeoutExpired:
             print(colored(f"{self.instance} timed out.", "red"))
+            self.timed_out = True
             self.terminate()
             return
 
     def manage_output(self, show_output):
-        po, pe = self.process.communicate()
-        po = str(po, encoding='utf-8').splitlines()
-        pe = str(pe, encoding='utf-8').splitlines()
-
-        if self.process.returncode != 0:
+        if self.returncode != 0:
             print(colored(f"RETURN CODE {self.instance}: "
-                          f"{self.process.returncode}", "red"))
-        for line in pe + po:
+                          f"{self.returncode}", "red"))
+        for line in self.output:
             if show_output:
                 print(" ", line)
 
+    def solution(self):
+        """ The solution printed by forest.py, or None if it printed none. """
+        if 'Solution:' not in self.output:
+            return None
+        idx = self.output.index('Solution:')
+        return self.output[idx + 1].strip() if idx + 1 < len(self.output) else None
+
+    def to_json(self):
+        return {'instance': self.instance.name, 'path': self.instance.path,
+                'encoding': self.encoding, 'command': self.command,
+                'returncode': self.returncode, 'timed_out': self.timed_out,
+                'time': round(self.elapsed, 3), 'solution': self.solution()}
+
 
 class TaskRunner:
     def __init__(self, instance_dirs, method='multitree', no_pruning=False, no_captures=False,
                  no_conditions=False, sketching='none', num_processes=1, timeout=120,
                  show_output=False, resnax=False, max_examples=-1, solve_only=-1,
-                 logs_dir=''):
+                 logs_dir='', warm_workers=False, results_path=''):
         self.show_output = show_output
         self.timeout = timeout
         self.tasks = []
         self.instances = []
         self.num_processes = num_processes
-        self.poll_time = min(30, self.timeout // 15)
+        self.warm_workers = warm_workers
+        self.results_path = results_path
         self.no_pruning = no_pruning
         self.no_captures = no_captures
         self.no_conditions = no_conditions
@@ -171,57 +323,73 @@ class TaskRunner:
 
         print(f"Created {len(self.tasks)} tasks.")
 
-        # tasks are ordered randomly
+        # tasks are run from the end of the list
         self.to_run = self.tasks.copy()
         # random.shuffle(self.to_run)
 
         # currently running tasks
         self.running = []
+        self.done = []
+        self._workers = queue.Queue()
+        self._stopped = False
 
     def run(self):
-        """ Starts running tasks in random order """
-        if self.num_processes == 1:
-            self.run_sequentially()
-            return
-        half_true_iter = half_true()
+        """ Runs the tasks on num_processes slots, starting the next task as soon as a slot
+        frees up. Each finished task is reported, and appended to the results file as a
+        JSON line. """
         start_time = time.time()
-        while len(self.to_run) > 0 or len(self.running) > 0:
-            to_remove = []
-            for task in self.running:
-                if task.is_done():
+        results_file = open(self.results_path, 'a') if len(self.results_path) > 0 else None
+        workers = []
+        if self.warm_workers:
+            workers = [WarmWorker() for _ in range(self.num_processes)]
+            for worker in workers:
+                self._workers.put(worker)
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_processes) as executor:
+                futures = []
+                while len(self.to_run) > 0:
+                    futures.append(executor.submit(self._run_task, self.to_run.pop()))
+                for future in as_completed(futures):
+                    task = future.result()
+                    if task is None:  # cancelled by terminate_all
+                        continue
                     task.manage_output(self.show_output)
-                    to_remove.append(task)
-            for t in to_remove:
-                self.running.remove(t)
-
-            while len(self.running) < self.num_processes:
-                if len(self.to_run) == 0:
-                    break
-                new_task = self.to_run.pop()
-                self.running.append(new_task)
-                new_task.run()
-            if next(half_true_iter):
-                print(f"{len(self.tasks) - len(self.to_run) - len(self.running)} done, "
-                      f"{len(self.to_run) + len(self.running)} to go. "
-                      f"Elapsed {nice_time(time.time() - start_time)}.")
-            time.sleep(self.poll_time)
-
-    def run_sequentially(self):
-        start_time = time.time()
-        while len(self.to_run) > 0:
-            new_task = self.to_run.pop()
-            self.running = [new_task]
-            new_task.run()
-            new_task.wait()
-            new_task.manage_output(self.show_output)
-            self.running = []
-            print(f"{len(self.tasks) - len(self.to_run) - len(self.running)} done, "
-                  f"{len(self.to_run) + len(self.running)} to go. "
-                  f"Elapsed {nice_time(time.time() - start_time)}.")
+                    self.done.append(task)
+                    if results_file is not None:
+                        results_file.write(json.dumps(task.to_json()) + '\n')
+                        results_file.flush()
+                    print(f"{len(self.done)} done, "
+                          f"{len(self.tasks) - len(self.done)} to go. "
+                          f"Elapsed {nice_time(time.time() - start_time)}.")
+        finally:
+            if results_file is not None:
+                results_file.close()
+            for worker in workers:
+                worker.stop()
+
+    def _run_task(self, task):
+        if self._stopped:
+            return None
+        worker = self._workers.get() if self.warm_workers else None
+        self.running.append(task)
+        try:
+            task.run(worker)
+        finally:
+            self.running.remove(task)
+            if worker is not None:
+                self._workers.put(worker)
+        return task
+
+    def print_results(self):
+        solved = sum(map(lambda t: t.solution() is not None and not t.timed_out, self.done))
+        timed_out = sum(map(lambda t: t.timed_out, self.done))
+        failed = sum(map(lambda t: t.returncode != 0 and not t.timed_out, self.done))
+        print(f"{len(self.done)} of {len(self.tasks)} tasks done: {solved} solved, "
+              f"{timed_out} timed out, {failed} failed.")
 
     def terminate_all(self):
         print(colored("Terminating all tasks", "red"))
+        self._stopped = True
         self.to_run = []
-        while len(self.running) > 0:
-            task = self.running.pop()
+        for task in list(self.running):
             task.terminate()
@@ -0,0 +1,38 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from task_runner import TaskRunner
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestTaskRunner(unittest.TestCase):
+
+    def _run(self, encoding, warm_workers):
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy(os.path.join(root, 'benchmarks', 'dec.txt'), directory)
+            runner = TaskRunner([directory], encoding, timeout=60, warm_workers=warm_workers)
+            runner.run()
+        self.assertEqual(len(runner.done), 1)
+        task = runner.done[0]
+        self.assertEqual(task.returncode, 0)
+        self.assertIsNotNone(task.solution())
+        self.assertFalse(task.timed_out)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_process(self):
+        self._run('multitree', warm_workers=False)
+
+    def test_warm_worker(self):
+        self._run('multitree', warm_workers=True)
+
+    def test_warm_worker_portfolio(self):
+        # The portfolio starts processes of its own inside the warm worker.
+        self._run('portfolio', warm_workers=True)
+
+
+if __name__ == '__main__':
+    unittest.main()